@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Optional
+from decouple import config
+from fastapi import FastAPI, HTTPException, Query
+from pydantic import BaseModel, Field, field_validator
+from comparacao import COMPARACAO_TIMEOUT, iniciar_comparacao, aguardar_comparacao
+from cotacao import cache_cotacoes
+from referencia import LIMITE_SUGESTOES
+import servico
+
+# -------------------------
+# API HTTP (JSON) DO MOTOR DE COMPARAÇÃO
+# -------------------------
+# Expõe o mesmo núcleo do app (servico.py) sem o Streamlit: busca de NCM,
+# tarifa, caixa master, cotações D2C e Formal e a comparação completa.
+# Os endpoints são assíncronos; o trabalho bloqueante (SQLite, API de
+# frete) roda num pool de threads, e os caches do processo são
+# compartilhados por todas as requisições. Com vários workers, os
+# snapshots Arrow mapeados em memória são compartilhados entre processos.
+# Uso: uvicorn api:app --host 0.0.0.0 --port 8000 --workers 4
+
+API_THREADS = config("API_THREADS", default=64, cast=int)
+
+@asynccontextmanager
+async def ciclo_de_vida(app):
+    # Pool padrão do loop dimensionado para chamadas de frete concorrentes
+    executor = ThreadPoolExecutor(max_workers=API_THREADS, thread_name_prefix="api")
+    asyncio.get_running_loop().set_default_executor(executor)
+    yield
+    executor.shutdown(wait=False)
+
+app = FastAPI(title="Comparação D2C x Exportação Formal", version="1.0", lifespan=ciclo_de_vida)
+
+class DadosItem(BaseModel):
+    ncm: Optional[str] = None
+    item_altura: float = Field(10, gt=0)
+    item_largura: float = Field(10, gt=0)
+    item_profundidade: float = Field(10, gt=0)
+    item_peso: float = Field(0.5, gt=0)
+    item_preco: float = Field(50.0, gt=0)
+    item_quantidade: int = Field(1, ge=1)
+    master_altura: float = Field(40, gt=0)
+    master_largura: float = Field(40, gt=0)
+    master_profundidade: float = Field(40, gt=0)
+    master_max_peso: float = Field(50.0, gt=0)
+    armazenagem: float = Field(0.50, ge=0)
+    frete_local: float = Field(5.00, ge=0)
+    # Sem tax_rate, a alíquota é resolvida pelo NCM
+    tax_rate: Optional[float] = Field(None, ge=0)
+    imposto_especifico: Optional[float] = Field(None, ge=0)
+
+    @field_validator("ncm")
+    @classmethod
+    def validar_ncm(cls, valor):
+        return servico.normalizar_ncm(valor) if valor is not None else None
+
+async def _em_thread(funcao, *args):
+    return await asyncio.get_running_loop().run_in_executor(None, funcao, *args)
+
+async def _dados(entrada, com_imposto=True):
+    # Empacotamento e D2C não usam o imposto: a tarifa nem é consultada.
+    # Para o Formal, a alíquota vem de tax_rate ou da tarifa do HS6 do NCM;
+    # sem nenhum dos dois o custo sairia com imposto zero, então a
+    # requisição é recusada (422) ou a tarifa não encontrada vira 404.
+    valores = entrada.model_dump(exclude_none=True)
+    if not com_imposto:
+        valores.setdefault("tax_rate", 0.0)
+        return await _em_thread(servico.montar_dados, valores)
+    tarifa = None
+    if entrada.tax_rate is None:
+        if servico.codigo_hs6(entrada.ncm) is None:
+            raise HTTPException(422, f"Informe tax_rate ou um NCM com ao menos {servico.DIGITOS_HS6} dígitos.")
+        tarifa = await _em_thread(servico.tarifa_ncm, entrada.ncm)
+        if tarifa is None:
+            raise HTTPException(404, f"Tarifa não encontrada para o HS6 do NCM {entrada.ncm}; informe tax_rate.")
+    return await _em_thread(servico.montar_dados, valores, tarifa)
+
+@app.get("/saude")
+async def saude():
+    return {"status": "ok", "cache_cotacoes": cache_cotacoes.estatisticas()}
+
+@app.get("/ncm")
+async def ncm(prefixo: str = "", descricao: str = "", limite: int = Query(LIMITE_SUGESTOES, ge=1, le=500)):
+    sugestoes = await _em_thread(servico.buscar_ncm, prefixo, descricao, limite)
+    if sugestoes is None:
+        raise HTTPException(400, f"Informe ao menos {servico.MINIMO_PREFIXO} dígitos do NCM "
+                                 f"ou {servico.MINIMO_DESCRICAO} letras da descrição.")
+    return {"sugestoes": [{"codigo": codigo, "descricao": descricao} for codigo, descricao in sugestoes]}
+
+@app.get("/tarifas/{ncm}")
+async def tarifa(ncm: str, item_peso: Optional[float] = Query(None, gt=0)):
+    try:
+        ncm = servico.normalizar_ncm(ncm)
+    except ValueError as erro:
+        raise HTTPException(422, str(erro))
+    resultado = await _em_thread(servico.resolver_tarifa, ncm, item_peso)
+    if resultado is None:
+        raise HTTPException(404, "Tarifa não encontrada para o HS6 do NCM.")
+    return resultado
+
+@app.post("/caixa-master")
+async def caixa_master(entrada: DadosItem):
+    dados = await _dados(entrada, com_imposto=False)
+    return await _em_thread(servico.empacotar, dados)
+
+@app.post("/cotacoes/d2c")
+async def cotacao_d2c(entrada: DadosItem):
+    dados = await _dados(entrada, com_imposto=False)
+    resultado = await _em_thread(servico.comparar_d2c, dados)
+    if resultado["transportadora"] is None:
+        raise HTTPException(502, "Cotação D2C indisponível.")
+    return resultado
+
+@app.post("/cotacoes/formal")
+async def cotacao_formal(entrada: DadosItem):
+    dados = await _dados(entrada)
+    resultado = await _em_thread(servico.comparar_formal, dados)
+    if resultado["transportadora"] is None:
+        raise HTTPException(502, "Cotação Formal indisponível.")
+    return resultado
+
+@app.post("/comparacao")
+async def comparacao(entrada: DadosItem):
+    # D2C, Formal e HTS de 10 dígitos saem em paralelo; a requisição só
+    # espera (sem ocupar thread) até a mais lenta terminar ou o prazo acabar
+    dados = await _dados(entrada)
+    futuros = iniciar_comparacao(dados)
+    await asyncio.wait([asyncio.wrap_future(futuro) for futuro in futuros.values()], timeout=COMPARACAO_TIMEOUT)
+    resultado = aguardar_comparacao(futuros, dados, timeout=0)
+    return servico.resumir_comparacao(resultado, dados)
@@ -1,12 +1,16 @@
 # -*- coding: utf-8 -*-
 
 import streamlit as st
-import sqlite3
 import pandas as pd
-import requests
-from decouple import config
-import numpy as np
-from bs4 import BeautifulSoup
+from comparacao import iniciar_comparacao, aguardar_comparacao, resultado_futuro, cotar_d2c
+from cotacao import calcular_frete_formal
+from custos import calcular_breakdown_formal, total_itens_nas_caixas
+from embalagem import caixa_master_dos_dados
+from otimizador_caixa import CAIXAS_PADRAO, otimizar_caixa_master
+from equilibrio import quantidade_equilibrio, preco_equilibrio
+from varredura import varrer_quantidades
+from referencia import comparar_destinos
+from servico import buscar_ncm, resolver_tarifa, montar_dados
 
 # Configuração da página
 st.set_page_config(page_title="Comparação de Modelos: D2C vs. Exportação", layout="wide")
@@ -69,136 +73,66 @@ default_keys = {
     "master_max_peso": 50.0,
     "armazenagem": 0.50,
     "frete_local": 5.00,
-    "tax_rate": 0.0
+    "tax_rate": 0.0,
+    "tarifa": None
 }
 for key, value in default_keys.items():
     if key not in st.session_state:
         st.session_state[key] = value
 
-API_KEY = config("SHIPSMART_API_KEY")
-
 # -------------------------
 # FUNÇÕES AUXILIARES
 # -------------------------
-def carregar_ncm():
-    conn = sqlite3.connect("ncm_database.db")
-    df = pd.read_sql_query("SELECT product_code, product_description FROM ncm", conn)
-    conn.close()
-    return df
-
-def buscar_sugestoes_ncm(ncm_parcial, df_ncm):
-    df_filtrado = df_ncm[df_ncm["product_code"].astype(str).str.startswith(str(ncm_parcial))]
-    return df_filtrado.values.tolist() if not df_filtrado.empty else []
+def descrever_aliquota(tarifa):
+    # Texto da alíquota estruturada da linha de menor AVE (ex.: "4.3% + US$ 0.30/un")
+    partes = []
+    if tarifa["ad_valorem"] is not None:
+        partes.append(f"{tarifa['ad_valorem'] * 100:.2f}%")
+    if tarifa["especifico"]:
+        partes.append(f"US$ {tarifa['especifico']:.4f}/{tarifa['unidade']}")
+    return " + ".join(partes)
 
-def carregar_hs_usa():
-    conn = sqlite3.connect("usa_database.db")
-    df = pd.read_sql_query("SELECT product_code, product_description, ave FROM hs_codes", conn)
-    conn.close()
-    return df
+def resultado_antecipado(nome):
+    # Resultado da cotação disparada em paralelo ao salvar os dados, se houver
+    futuros = st.session_state.get("comparacao_futuros")
+    if not futuros or nome not in futuros:
+        return None
+    return resultado_futuro(futuros[nome])
 
-def buscar_hs_usa_ia(ncm_6_digitos, df_hs_usa):
-    resultados = df_hs_usa[df_hs_usa["product_code"].astype(str).str.startswith(str(ncm_6_digitos))]
-    return resultados.values.tolist() if not resultados.empty else []
+def registrar_frete_d2c(nome, valor):
+    st.session_state.frete_d2c = f"Frete D2C por item: {nome} - ${valor:.2f}"
+    st.session_state.frete_d2c_value = valor
 
-def buscar_hs_10_digitos(hs_code_6):
-    url = f"https://hts.usitc.gov/search?q={hs_code_6}"
-    headers = {"User-Agent": "Mozilla/5.0"}
-    response = requests.get(url, headers=headers)
-    if response.status_code == 200:
-        soup = BeautifulSoup(response.text, "html.parser")
-        for row in soup.find_all("tr", class_=["odd", "even"]):
-            cols = row.find_all("td")
-            if len(cols) > 1:
-                codigo = cols[0].text.strip()
-                taxa = cols[-1].text.strip()
-                if codigo.startswith(str(hs_code_6)):
-                    return codigo, taxa
-    return None, None
+def registrar_caixa_master(num_boxes, total_weight, capacity, boxes):
+    st.session_state.master_boxes = boxes
+    st.session_state.num_boxes = num_boxes
+    st.session_state.total_weight = total_weight
+    st.session_state.capacity = capacity
 
-def calcular_frete_d2c(altura, largura, profundidade, peso, preco, quantidade):
-    url = "https://api.shipsmart.com.br/v2/quotation?level=simple"
-    headers = {"Authorization": f"Bearer {API_KEY}", "Content-Type": "application/json"}
-    pacotes = [{
-        "name": f"Pacote {i+1}",
-        "height": altura,
-        "width": largura,
-        "depth": profundidade,
-        "weight": peso,
-        "price": preco
-    } for i in range(quantidade)]
-    payload = {
-        "object": "not_doc",
-        "type": "simple",
-        "tax": "receiver",
-        "insurance": False,
-        "residential_delivery": False,
-        "non_stackable": False,
-        "currency_quote": "USD",
-        "currency_payment": "USD",
-        "address_sender": {"country_code": "BR"},
-        "address_receiver": {"country_code": "US"},
-        "boxes": pacotes
-    }
-    response = requests.post(url, headers=headers, json=payload)
-    if response.status_code == 200:
-        fretes = response.json()
-        if "data" in fretes and "carriers" in fretes["data"]:
-            opcoes_frete = fretes["data"]["carriers"]
-            frete_mais_barato = min(opcoes_frete, key=lambda x: float(x["currency_payment_amount"]))
-            return frete_mais_barato["name"], float(frete_mais_barato["currency_payment_amount"])
-    return None, None
+def registrar_frete_formal(nome, valor, dados):
+    st.session_state.frete_formal = f"Frete Formal consolidado: {nome} - ${valor:.2f}"
+    total_items = total_itens_nas_caixas(st.session_state.master_boxes, dados["item_preco"])
+    breakdown = calcular_breakdown_formal(valor, total_items, dados)
+    st.session_state.formal_cost_per_item = breakdown["Total Formal por Item"]
+    st.session_state.formal_breakdown = breakdown
+    return total_items
 
-def calcular_caixa_master(item_altura, item_largura, item_profundidade, item_peso, item_quantidade, item_preco,
-                          master_altura, master_largura, master_profundidade, master_max_peso):
-    item_volume = item_altura * item_largura * item_profundidade
-    master_volume = master_altura * master_largura * master_profundidade
-    cap_by_volume = master_volume // item_volume
-    cap_by_weight = master_max_peso // item_peso
-    capacity = int(min(cap_by_volume, cap_by_weight))
-    if capacity <= 0:
-        capacity = 1
-    num_boxes = int(np.ceil(item_quantidade / capacity))
-    total_weight = item_quantidade * item_peso
-    boxes = []
-    remaining = item_quantidade
-    for i in range(num_boxes):
-        items_in_box = capacity if remaining >= capacity else remaining
-        box_weight = items_in_box * item_peso
-        box_price = items_in_box * item_preco  
-        boxes.append({
-            "name": f"Caixa {i+1}",
-            "height": master_altura,
-            "width": master_largura,
-            "depth": master_profundidade,
-            "weight": box_weight,
-            "price": box_price
-        })
-        remaining -= items_in_box
-    return num_boxes, total_weight, capacity, boxes
-
-def calcular_frete_formal(boxes):
-    # Se a opção manual foi escolhida, o cálculo automático não será utilizado.
-    url = "https://api.shipsmart.com.br/v2/quotation?level=simple"
-    headers = {"Authorization": f"Bearer {API_KEY}", "Content-Type": "application/json"}
-    payload = {
-        "object": "not_doc",
-        "type": "simple",
-        "tax": "receiver",
-        "insurance": False,
-        "currency_quote": "USD",
-        "currency_payment": "USD",
-        "address_sender": {"country_code": "BR"},
-        "address_receiver": {"country_code": "US"},
-        "boxes": boxes
-    }
-    response = requests.post(url, headers=headers, json=payload)
-    if response.status_code == 200:
-        data = response.json()
-        if "data" in data and "carriers" in data["data"]:
-            opcoes_frete = data["data"]["carriers"]
-            frete_mais_barato = min(opcoes_frete, key=lambda x: float(x["currency_payment_amount"]))
-            return frete_mais_barato["name"], float(frete_mais_barato["currency_payment_amount"])
-    return None, None
+def comparar_e_registrar(futuros, dados):
+    with st.spinner("Calculando fretes D2C e Formal em paralelo..."):
+        resultado = aguardar_comparacao(futuros, dados)
+    d2c = resultado.get("d2c") or (None, None)
+    formal = resultado.get("formal")
+    if d2c[0]:
+        registrar_frete_d2c(*d2c)
+    if formal:
+        registrar_caixa_master(formal["num_boxes"], formal["total_weight"], formal["capacity"], formal["boxes"])
+        if formal["nome"]:
+            registrar_frete_formal(formal["nome"], formal["valor"], dados)
+    if d2c[0] and formal and formal["nome"]:
+        st.session_state.page = "resultado"
+    else:
+        st.error("Erro ao calcular os fretes em paralelo. Siga pelas etapas D2C e Formal.")
+        st.session_state.page = "d2c"
 
 # ============================
 # PÁGINAS DO APP
@@ -221,22 +155,26 @@ def page_dados():
     with st.container():
         st.subheader("Classificação NCM")
         ncm_parcial = st.text_input("Digite pelo menos 4 dígitos do NCM", key="ncm_input")
-        if len(ncm_parcial) >= 4:
-            df_ncm = carregar_ncm()
-            sugestoes_ncm = buscar_sugestoes_ncm(ncm_parcial, df_ncm)
-            if sugestoes_ncm:
-                escolha = st.selectbox("Selecione o NCM correspondente:", 
-                                       [f"{codigo} - {descricao}" for codigo, descricao in sugestoes_ncm],
-                                       key="ncm_select")
-                codigo_ncm_selecionado = escolha.split(" - ")[0]
-                df_hs_usa = carregar_hs_usa()
-                hs_usa = buscar_hs_usa_ia(codigo_ncm_selecionado[:6], df_hs_usa)
-                if hs_usa:
-                    melhor_hs = min(hs_usa, key=lambda x: float(x[2]) if x[2] != "N/A" else float("inf"))
-                    st.write(f"**Taxa de Importação (AVE):** {melhor_hs[2]}")
-                    st.session_state.tax_rate = float(melhor_hs[2]) if melhor_hs[2] != "N/A" else 0.0
-        else:
-            st.warning("Digite pelo menos 4 dígitos do NCM para ver sugestões.")
+        descricao_busca = st.text_input("Ou busque pela descrição do produto (ex.: calçados de couro)", key="ncm_descricao")
+        sugestoes_ncm = buscar_ncm(ncm_parcial, descricao_busca)
+        if sugestoes_ncm is None:
+            st.warning("Digite pelo menos 4 dígitos do NCM ou parte da descrição para ver sugestões.")
+        st.session_state.ncm_codigo = None
+        if sugestoes_ncm:
+            escolha = st.selectbox("Selecione o NCM correspondente:", 
+                                   [f"{codigo} - {descricao}" for codigo, descricao in sugestoes_ncm],
+                                   key="ncm_select")
+            codigo_ncm_selecionado = escolha.split(" - ")[0]
+            st.session_state.ncm_codigo = codigo_ncm_selecionado
+            tarifa = resolver_tarifa(codigo_ncm_selecionado)
+            st.session_state.tarifa = tarifa
+            if tarifa:
+                ave = tarifa["ave_min"]
+                st.write(f"**Taxa de Importação (AVE):** {ave if ave is not None else 'N/A'}")
+                if descrever_aliquota(tarifa):
+                    st.write(f"**Alíquota ({tarifa['melhor_codigo']}):** {descrever_aliquota(tarifa)}")
+        elif sugestoes_ncm is not None:
+            st.warning("Nenhum NCM encontrado para a busca.")
     st.markdown("---")
     st.subheader("Dados do Item")
     col1, col2, col3 = st.columns(3)
@@ -269,11 +207,14 @@ def page_dados():
         st.number_input("Custo de Armazenagem por item (USD)", min_value=0.0, value=0.50, format="%.2f", key="armazenagem")
     with col10:
         st.number_input("Custo de Frete Local por item (USD)", min_value=0.0, value=5.00, format="%.2f", key="frete_local")
+    st.checkbox("Comparação rápida: calcular D2C e Formal (automático) em paralelo e ir direto ao resultado",
+                key="modo_comparacao")
     if st.button("Salvar Dados e Avançar", key="btn_salvar"):
-        if len(st.session_state.get("ncm_input", "")) < 4:
-            st.error("Preencha o NCM com pelo menos 4 dígitos.")
+        if not st.session_state.get("ncm_codigo"):
+            st.error("Selecione um NCM (pelo código ou pela descrição).")
         else:
-            st.session_state.dados_inseridos = {
+            st.session_state.dados_inseridos = montar_dados({
+                "ncm": st.session_state.ncm_codigo,
                 "item_altura": st.session_state.item_altura,
                 "item_largura": st.session_state.item_largura,
                 "item_profundidade": st.session_state.item_profundidade,
@@ -285,12 +226,20 @@ def page_dados():
                 "master_profundidade": st.session_state.master_profundidade,
                 "master_max_peso": st.session_state.master_max_peso,
                 "armazenagem": st.session_state.armazenagem,
-                "frete_local": st.session_state.frete_local,
-                "tax_rate": st.session_state.tax_rate
-            }
+                "frete_local": st.session_state.frete_local
+            }, tarifa=st.session_state.tarifa)
+            st.session_state.tax_rate = st.session_state.dados_inseridos["tax_rate"]
             st.session_state.dados_salvos = True
+            for chave in ["frete_d2c", "frete_d2c_value", "master_boxes", "frete_formal", "formal_cost_per_item", "formal_breakdown"]:
+                st.session_state.pop(chave, None)
+            # Dispara D2C, formal e HTS de 10 dígitos em paralelo
+            futuros = iniciar_comparacao(st.session_state.dados_inseridos)
+            st.session_state.comparacao_futuros = futuros
             st.success("Dados salvos com sucesso!")
-            st.session_state.page = "d2c"
+            if st.session_state.get("modo_comparacao", False):
+                comparar_e_registrar(futuros, st.session_state.dados_inseridos)
+            else:
+                st.session_state.page = "d2c"
 
 def page_d2c():
     st.title("Etapa 2: Calcular Frete D2C")
@@ -300,17 +249,11 @@ def page_d2c():
     st.write("**Dados Utilizados:**", st.session_state.dados_inseridos)
     if st.button("Calcular Frete D2C", key="btn_calcular_d2c"):
         dados = st.session_state.dados_inseridos
-        nome, valor = calcular_frete_d2c(
-            dados["item_altura"],
-            dados["item_largura"],
-            dados["item_profundidade"],
-            dados["item_peso"],
-            dados["item_preco"],
-            1
-        )
+        nome, valor = resultado_antecipado("d2c") or (None, None)
+        if not nome:
+            nome, valor = cotar_d2c(dados)
         if nome:
-            st.session_state.frete_d2c = f"Frete D2C por item: {nome} - ${valor:.2f}"
-            st.session_state.frete_d2c_value = valor
+            registrar_frete_d2c(nome, valor)
             st.success("Frete D2C calculado com sucesso!")
         else:
             st.error("Erro ao calcular Frete D2C.")
@@ -332,33 +275,40 @@ def page_formal():
         manual_frete = st.number_input("Digite o valor do embarque (USD)", min_value=0.0, value=0.0, key="frete_formal_manual")
 
     if st.button("Calcular Caixa Master", key="btn_caixa_master"):
-        num_boxes, total_weight, capacity, boxes = calcular_caixa_master(
-            dados["item_altura"],
-            dados["item_largura"],
-            dados["item_profundidade"],
-            dados["item_peso"],
-            dados["item_quantidade"],
-            dados["item_preco"],
-            dados["master_altura"],
-            dados["master_largura"],
-            dados["master_profundidade"],
-            dados["master_max_peso"]
-        )
-        st.session_state.master_boxes = boxes
-        st.session_state.num_boxes = num_boxes
-        st.session_state.total_weight = total_weight
-        st.session_state.capacity = capacity
+        num_boxes, total_weight, capacity, boxes = caixa_master_dos_dados(dados)
+        registrar_caixa_master(num_boxes, total_weight, capacity, boxes)
         st.subheader("Configuração da Caixa Master")
         st.write(f"Caixas necessárias: **{num_boxes}**")
         st.write(f"Peso total dos itens: **{total_weight} kg**")
         st.write(f"Capacidade máxima por caixa: **{capacity} itens**")
-        st.table(pd.DataFrame(boxes))
+        st.table(pd.DataFrame(boxes.resumo()))
+    with st.expander("Sugerir a melhor caixa master do estoque"):
+        caixas = st.data_editor(pd.DataFrame(CAIXAS_PADRAO), num_rows="dynamic", key="estoque_caixas")
+        if st.button("Avaliar caixas do estoque", key="btn_otimizar_caixa"):
+            with st.spinner("Avaliando empacotamento e frete por caixa..."):
+                otimizacao = otimizar_caixa_master(dados, caixas.dropna().to_dict("records"))
+            melhor = otimizacao["melhor"]
+            if otimizacao["descartadas"]:
+                st.caption("O item não cabe em: " + ", ".join(otimizacao["descartadas"]))
+            if not otimizacao["candidatos"]:
+                st.error("O item não cabe em nenhuma caixa do estoque.")
+            elif melhor is None:
+                st.error("Erro ao cotar o frete das caixas do estoque.")
+            else:
+                st.success(f"Melhor caixa: **{melhor['caixa']}** - {melhor['num_caixas']} caixas, "
+                           f"frete {melhor['transportadora']} ${melhor['frete']:.2f} + caixas ${melhor['custo_caixas']:.2f}")
+                st.table(pd.DataFrame(otimizacao["candidatos"]).drop(columns=["boxes"]))
+                st.caption(f"Cotações utilizadas: {otimizacao['cotacoes']} de {len(otimizacao['candidatos'])} caixas")
     if st.button("Calcular Frete Formal", key="btn_calcular_formal"):
         if "master_boxes" not in st.session_state:
             st.error("Primeiro calcule a configuração da Caixa Master.")
         else:
             if opcao_frete == "Automático":
-                nome, valor = calcular_frete_formal(st.session_state.master_boxes)
+                formal = resultado_antecipado("formal")
+                if formal and formal["nome"] and formal["boxes"] == st.session_state.master_boxes:
+                    nome, valor = formal["nome"], formal["valor"]
+                else:
+                    nome, valor = calcular_frete_formal(st.session_state.master_boxes)
             else:
                 # Se manual, verifica se o valor inserido é maior que zero
                 if st.session_state.get("frete_formal_manual", 0) > 0:
@@ -368,31 +318,8 @@ def page_formal():
                     st.error("Insira um valor manual válido para o frete formal.")
                     return
             if nome:
-                st.session_state.frete_formal = f"Frete Formal consolidado: {nome} - ${valor:.2f}"
-                total_items = sum([box["price"] / dados["item_preco"] for box in st.session_state.master_boxes])
+                total_items = registrar_frete_formal(nome, valor, dados)
                 st.write("Total de itens nas caixas:", total_items)
-                custo_frete_por_item = valor / total_items
-                total_valor_itens = dados["item_preco"] * dados["item_quantidade"]
-                if total_valor_itens < 800:
-                    imposto_por_item = 0
-                else:
-                    imposto_por_item = dados["tax_rate"] * dados["item_preco"]
-                custo_armazenagem_total = dados["armazenagem"] * total_items
-                custo_frete_local_total = dados["frete_local"] * total_items
-                custo_total_formal = valor + (imposto_por_item * total_items) + custo_armazenagem_total + custo_frete_local_total
-                formal_cost_per_item = custo_total_formal / total_items
-                st.session_state.formal_cost_per_item = formal_cost_per_item
-                st.session_state.formal_breakdown = {
-                    "Frete Formal Total": valor,
-                    "Quantidade de Itens": total_items,
-                    "Custo de Frete por Item": custo_frete_por_item,
-                    "Imposto por Item": imposto_por_item,
-                    "Custo de Armazenagem Total": custo_armazenagem_total,
-                    "Custo de Armazenagem por Item": custo_armazenagem_total / total_items,
-                    "Custo de Frete Local Total": custo_frete_local_total,
-                    "Custo de Frete Local por Item": custo_frete_local_total / total_items,
-                    "Total Formal por Item": formal_cost_per_item,
-                }
                 st.success("Frete Formal calculado com sucesso!")
             else:
                 st.error("Erro ao calcular Frete Formal.")
@@ -412,6 +339,18 @@ def page_resultado():
     formal_valor = st.session_state.formal_cost_per_item
     st.write(f"**D2C - Custo por item:** ${d2c_valor:.2f}")
     st.write(f"**Formal - Custo por item:** ${formal_valor:.2f}")
+    hts10 = resultado_antecipado("hts10")
+    if hts10 and hts10[0]:
+        st.write(f"**Código HTS (10 dígitos):** {hts10[0]} - Alíquota geral: {hts10[1]}")
+    codigo_ncm = st.session_state.dados_inseridos.get("ncm")
+    if codigo_ncm:
+        destinos = comparar_destinos(codigo_ncm)
+        if not destinos.empty:
+            with st.expander("Tarifas por mercado de destino"):
+                st.dataframe(destinos.rename(columns={
+                    "destino": "Destino", "ano": "Ano", "revisao": "Revisão HS", "linhas": "Linhas",
+                    "ave_min": "AVE mínimo", "ave_max": "AVE máximo", "melhor_codigo": "Código de menor AVE",
+                }), hide_index=True)
     total_items = st.session_state.dados_inseridos["item_quantidade"]
     total_d2c = total_items * d2c_valor
     total_formal = total_items * formal_valor
@@ -434,6 +373,50 @@ def page_resultado():
         {"Item": "Total Formal por Item", "Valor (USD)": f"${st.session_state.formal_breakdown['Total Formal por Item']:.2f}"}
     ]
     st.table(pd.DataFrame(breakdown_data))
+    st.subheader("Ponto de Equilíbrio")
+    quantidade_maxima = st.number_input("Quantidade máxima a considerar", min_value=1, value=10000, key="equilibrio_max")
+    if st.button("Calcular ponto de equilíbrio", key="btn_equilibrio"):
+        dados = st.session_state.dados_inseridos
+        with st.spinner("Buscando o ponto de equilíbrio..."):
+            por_quantidade = quantidade_equilibrio(dados, int(quantidade_maxima), frete_d2c=d2c_valor)
+            por_preco = preco_equilibrio(dados, frete_d2c=d2c_valor)
+        if por_quantidade is None or por_preco is None:
+            st.error("Erro ao cotar o frete para o ponto de equilíbrio.")
+        else:
+            sem_imposto = por_quantidade["equilibrio_sem_imposto"]
+            com_imposto = por_quantidade["equilibrio_com_imposto"]
+            tributada = por_quantidade["quantidade_tributada"]
+            if sem_imposto and com_imposto != tributada:
+                st.write(f"**Quantidade de equilíbrio:** o Formal fica mais barato a partir de {sem_imposto} itens "
+                         f"(${por_quantidade['custo_formal_por_item']:.2f} por item), enquanto o embarque fica "
+                         f"abaixo de US$ 800 (até {tributada - 1} itens).")
+                if com_imposto:
+                    st.write(f"Com o imposto de importação, o Formal volta a vencer a partir de {com_imposto} itens.")
+                elif tributada <= int(quantidade_maxima):
+                    st.write(f"Com o imposto de importação, o Formal não volta a vencer até {int(quantidade_maxima)} itens.")
+            elif por_quantidade["quantidade_equilibrio"]:
+                st.write(f"**Quantidade de equilíbrio:** a partir de {por_quantidade['quantidade_equilibrio']} itens "
+                         f"o Formal fica mais barato (${por_quantidade['custo_formal_por_item']:.2f} por item).")
+            else:
+                st.write(f"**Quantidade de equilíbrio:** o Formal não fica mais barato até {int(quantidade_maxima)} itens.")
+            if por_preco["preco_equilibrio"] == float("inf"):
+                st.write(f"**Preço de equilíbrio:** para {dados['item_quantidade']} itens, o Formal vence a qualquer preço.")
+            else:
+                st.write(f"**Preço de equilíbrio:** para {dados['item_quantidade']} itens, o D2C passa a ser mais barato "
+                         f"a partir de ${por_preco['preco_equilibrio']:.2f} por item.")
+            st.caption(f"Cotações utilizadas: {por_quantidade['cotacoes']}")
+    st.subheader("Curva de Custo por Quantidade")
+    if st.button("Gerar curva de custo", key="btn_varredura"):
+        dados = st.session_state.dados_inseridos
+        with st.spinner("Cotando pontos-âncora e interpolando a curva de frete..."):
+            curva = varrer_quantidades(dados, range(1, int(quantidade_maxima) + 1), frete_d2c=d2c_valor)
+        if curva is None:
+            st.error("Erro ao cotar o frete para a curva de custo.")
+        else:
+            st.line_chart(curva.set_index("quantidade")[["formal_por_item", "d2c_por_item"]])
+            st.caption(f"Cotações utilizadas: {curva.attrs['cotacoes']} · "
+                       f"erro máximo do frete interpolado: ${curva['erro_maximo'].max():.2f} "
+                       f"(supondo que o frete não diminui com a quantidade)")
 
 # ============================
 # LAYOUT: Conteúdo principal (toda a tela, sem sidebar)
@@ -466,8 +449,8 @@ with st.container():
     # Botão Próxima Etapa com trava
     if st.session_state.page == "dados":
         if st.button("Próxima Etapa", key="next_dados"):
-            if len(st.session_state.get("ncm_input", "")) < 4:
-                st.error("Você deve preencher o NCM com pelo menos 4 dígitos antes de prosseguir.")
+            if not st.session_state.get("ncm_codigo"):
+                st.error("Você deve selecionar um NCM antes de prosseguir.")
             else:
                 st.session_state.page = "d2c"
     elif st.session_state.page == "d2c":
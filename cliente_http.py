@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from decouple import config
+
+# -------------------------
+# CONFIGURAÇÃO
+# -------------------------
+HTTP_TIMEOUT_CONEXAO = config("HTTP_TIMEOUT_CONEXAO", default=3.05, cast=float)
+HTTP_TIMEOUT_LEITURA = config("HTTP_TIMEOUT_LEITURA", default=20.0, cast=float)
+HTTP_TENTATIVAS = config("HTTP_TENTATIVAS", default=3, cast=int)
+HTTP_BACKOFF_BASE = config("HTTP_BACKOFF_BASE", default=0.5, cast=float)
+HTTP_BACKOFF_MAXIMO = config("HTTP_BACKOFF_MAXIMO", default=8.0, cast=float)
+HTTP_POOL = config("HTTP_POOL", default=32, cast=int)
+# Circuito abre após N falhas seguidas no mesmo host e fica aberto por X segundos
+CIRCUITO_FALHAS = config("CIRCUITO_FALHAS", default=5, cast=int)
+CIRCUITO_ESPERA = config("CIRCUITO_ESPERA", default=30.0, cast=float)
+
+STATUS_REPETIR = {429, 500, 502, 503, 504}
+
+class CircuitoAberto(requests.RequestException):
+    pass
+
+# -------------------------
+# DISJUNTOR (CIRCUIT BREAKER) POR HOST
+# -------------------------
+# Enquanto aberto, as chamadas falham na hora em vez de prender a thread do
+# Streamlit esperando um serviço fora do ar. Após a espera, uma chamada de
+# teste é liberada: se funcionar o circuito fecha, senão reabre.
+class Disjuntor:
+    def __init__(self, limite_falhas=CIRCUITO_FALHAS, espera=CIRCUITO_ESPERA):
+        self.limite_falhas = limite_falhas
+        self.espera = espera
+        self.falhas = 0
+        self.aberto_ate = 0.0
+        self._teste_em_andamento = False
+        self._lock = threading.Lock()
+
+    def permitir(self):
+        with self._lock:
+            if self.falhas < self.limite_falhas:
+                return True
+            if time.monotonic() < self.aberto_ate or self._teste_em_andamento:
+                return False
+            self._teste_em_andamento = True
+            return True
+
+    def registrar_sucesso(self):
+        with self._lock:
+            self.falhas = 0
+            self._teste_em_andamento = False
+
+    def registrar_falha(self):
+        with self._lock:
+            self.falhas += 1
+            self._teste_em_andamento = False
+            if self.falhas >= self.limite_falhas:
+                self.aberto_ate = time.monotonic() + self.espera
+
+    @property
+    def estado(self):
+        with self._lock:
+            if self.falhas < self.limite_falhas:
+                return "fechado"
+            return "aberto" if time.monotonic() < self.aberto_ate else "meio_aberto"
+
+_disjuntores = {}
+_lock_disjuntores = threading.Lock()
+
+def disjuntor_para(url):
+    host = urlsplit(url).netloc
+    with _lock_disjuntores:
+        if host not in _disjuntores:
+            _disjuntores[host] = Disjuntor()
+        return _disjuntores[host]
+
+# -------------------------
+# SESSÃO COMPARTILHADA
+# -------------------------
+# Uma única Session por processo reaproveita conexões TCP/TLS (keep-alive)
+# entre sessões do Streamlit; o pool é seguro para uso entre threads.
+def _criar_sessao():
+    sessao = requests.Session()
+    adaptador = HTTPAdapter(pool_connections=HTTP_POOL, pool_maxsize=HTTP_POOL)
+    sessao.mount("https://", adaptador)
+    sessao.mount("http://", adaptador)
+    return sessao
+
+sessao = _criar_sessao()
+
+def _espera_backoff(tentativa, response=None):
+    if response is not None and response.headers.get("Retry-After", "").isdigit():
+        return min(float(response.headers["Retry-After"]), HTTP_BACKOFF_MAXIMO)
+    # Backoff exponencial com jitter completo
+    return random.uniform(0, min(HTTP_BACKOFF_MAXIMO, HTTP_BACKOFF_BASE * 2 ** tentativa))
+
+def requisitar(metodo, url, tentativas=None, timeout=None, **kwargs):
+    # Repete em 429/5xx e erros de conexão. Depois da última tentativa
+    # devolve a resposta recebida (o chamador confere o status) ou relança
+    # o erro de rede. Levanta CircuitoAberto se o host estiver em falha.
+    disjuntor = disjuntor_para(url)
+    tentativas = max(1, HTTP_TENTATIVAS if tentativas is None else tentativas)
+    timeout = timeout or (HTTP_TIMEOUT_CONEXAO, HTTP_TIMEOUT_LEITURA)
+    for tentativa in range(tentativas):
+        if not disjuntor.permitir():
+            raise CircuitoAberto(f"Circuito aberto para {urlsplit(url).netloc}")
+        try:
+            response = sessao.request(metodo, url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            disjuntor.registrar_falha()
+            if tentativa == tentativas - 1:
+                raise
+            time.sleep(_espera_backoff(tentativa))
+            continue
+        except Exception:
+            # Outros erros (URL inválida, SSL, etc.) não são repetidos, mas
+            # também liberam o teste do meio-aberto para não travar o circuito
+            disjuntor.registrar_falha()
+            raise
+        if response.status_code not in STATUS_REPETIR:
+            disjuntor.registrar_sucesso()
+            return response
+        disjuntor.registrar_falha()
+        if tentativa == tentativas - 1:
+            return response
+        time.sleep(_espera_backoff(tentativa, response))
+    return response
+
+def get(url, **kwargs):
+    return requisitar("GET", url, **kwargs)
+
+def post(url, **kwargs):
+    return requisitar("POST", url, **kwargs)
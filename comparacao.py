@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+from concurrent.futures import ThreadPoolExecutor, wait
+from decouple import config
+from cotacao import calcular_frete_d2c, calcular_frete_formal
+from custos import calcular_breakdown_formal, total_itens_nas_caixas
+from embalagem import caixa_master_dos_dados
+from hts import buscar_hs_10_digitos
+
+COMPARACAO_THREADS = config("COMPARACAO_THREADS", default=16, cast=int)
+COMPARACAO_TIMEOUT = config("COMPARACAO_TIMEOUT", default=60.0, cast=float)
+
+# -------------------------
+# COTAÇÕES EM PARALELO
+# -------------------------
+# Pool compartilhado pelo processo: a cotação D2C, a cotação formal e a
+# busca do HTS de 10 dígitos saem ao mesmo tempo, e o resultado fica pronto
+# quando a chamada mais lenta termina (não após a soma de todas).
+_executor = ThreadPoolExecutor(max_workers=COMPARACAO_THREADS, thread_name_prefix="comparacao")
+
+def cotar_d2c(dados):
+    return calcular_frete_d2c(
+        dados["item_altura"],
+        dados["item_largura"],
+        dados["item_profundidade"],
+        dados["item_peso"],
+        dados["item_preco"],
+        1
+    )
+
+def cotar_formal(dados):
+    num_boxes, total_weight, capacity, boxes = caixa_master_dos_dados(dados)
+    nome, valor = calcular_frete_formal(boxes)
+    return {
+        "num_boxes": num_boxes,
+        "total_weight": total_weight,
+        "capacity": capacity,
+        "boxes": boxes,
+        "nome": nome,
+        "valor": valor,
+    }
+
+def iniciar_comparacao(dados):
+    futuros = {
+        "d2c": _executor.submit(cotar_d2c, dados),
+        "formal": _executor.submit(cotar_formal, dados),
+    }
+    # Só com o HS6 completo; uma posição de 4 dígitos não identifica a linha HTS
+    if len(dados.get("ncm") or "") >= 6:
+        futuros["hts10"] = _executor.submit(buscar_hs_10_digitos, dados["ncm"][:6])
+    return futuros
+
+def resultado_futuro(futuro, timeout=COMPARACAO_TIMEOUT):
+    # None se a tarefa falhar ou não terminar dentro do prazo
+    try:
+        return futuro.result(timeout=timeout)
+    except Exception:
+        return None
+
+def aguardar_comparacao(futuros, dados, timeout=COMPARACAO_TIMEOUT):
+    wait(list(futuros.values()), timeout=timeout)
+    resultado = {nome: resultado_futuro(futuro, timeout=0) for nome, futuro in futuros.items()}
+    formal = resultado.get("formal")
+    if formal and formal["nome"]:
+        total_items = total_itens_nas_caixas(formal["boxes"], dados["item_preco"])
+        formal["breakdown"] = calcular_breakdown_formal(formal["valor"], total_items, dados)
+    return resultado
+
+def comparar(dados, timeout=COMPARACAO_TIMEOUT):
+    return aguardar_comparacao(iniciar_comparacao(dados), dados, timeout)
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+from embalagem import capacidade_geometrica
+
+# -------------------------
+# CONSOLIDAÇÃO DE VÁRIOS SKUs EM CAIXAS MASTER
+# -------------------------
+# First-fit decreasing com restrição de peso e de volume. O volume de cada
+# unidade é o "volume efetivo" do SKU: a fração da caixa que ela ocupa
+# quando a caixa é cheia só com esse SKU (1 / capacidade geométrica). Assim
+# uma caixa de um único SKU recebe exatamente a capacidade calculada pelo
+# empacotador 3D; em caixas mistas a fração é uma aproximação.
+# As unidades de um mesmo SKU são alocadas em bloco, então o custo depende
+# do número de SKUs e de caixas, não do número de unidades.
+
+EPSILON = 1e-9
+
+class CaixaConsolidada:
+    def __init__(self, max_peso):
+        self.max_peso = max_peso
+        self.ocupacao = 0.0
+        self.peso = 0.0
+        self.valor = 0.0
+        self.conteudo = {}
+
+    def cabe(self, sku, quantidade_maxima):
+        por_volume = int((1.0 - self.ocupacao + EPSILON) / sku["fracao"])
+        por_peso = int((self.max_peso - self.peso + EPSILON) / sku["item_peso"])
+        return max(0, min(quantidade_maxima, por_volume, por_peso))
+
+    def adicionar(self, sku, quantidade):
+        self.ocupacao += quantidade * sku["fracao"]
+        self.peso += quantidade * sku["item_peso"]
+        self.valor += quantidade * sku["item_preco"]
+        self.conteudo[sku["sku"]] = self.conteudo.get(sku["sku"], 0) + quantidade
+
+    def remover(self, sku, quantidade):
+        self.ocupacao -= quantidade * sku["fracao"]
+        self.peso -= quantidade * sku["item_peso"]
+        self.valor -= quantidade * sku["item_preco"]
+        self.conteudo[sku["sku"]] -= quantidade
+        if not self.conteudo[sku["sku"]]:
+            del self.conteudo[sku["sku"]]
+
+def _preparar_skus(skus, master_altura, master_largura, master_profundidade, master_max_peso):
+    # O nome identifica o SKU no conteúdo das caixas: nomes repetidos (inclusive
+    # um "SKU 2" explícito contra o nome padrão de outra linha) misturariam
+    # as quantidades, então são recusados
+    preparados = []
+    nomes = set()
+    for indice, sku in enumerate(skus):
+        sku = dict(sku)
+        sku.setdefault("sku", f"SKU {indice + 1}")
+        if sku["sku"] in nomes:
+            raise ValueError(f"SKU repetido: {sku['sku']}")
+        nomes.add(sku["sku"])
+        if sku["item_peso"] <= 0:
+            raise ValueError(f"{sku['sku']} precisa de peso maior que zero")
+        capacidade = capacidade_geometrica(sku["item_altura"], sku["item_largura"], sku["item_profundidade"],
+                                           master_altura, master_largura, master_profundidade)
+        if capacidade <= 0 or sku["item_peso"] > master_max_peso:
+            raise ValueError(f"{sku['sku']} não cabe na caixa master")
+        sku["fracao"] = 1.0 / capacidade
+        preparados.append(sku)
+    return preparados
+
+def _primeiro_encaixe(caixas, max_peso, sku, quantidade):
+    for caixa in caixas:
+        if not quantidade:
+            break
+        n = caixa.cabe(sku, quantidade)
+        if n:
+            caixa.adicionar(sku, n)
+            quantidade -= n
+    while quantidade:
+        caixa = CaixaConsolidada(max_peso)
+        n = caixa.cabe(sku, quantidade)
+        caixa.adicionar(sku, n)
+        caixas.append(caixa)
+        quantidade -= n
+
+def _esvaziar_caixa(caixas, indice, skus_por_nome):
+    # Tenta redistribuir todo o conteúdo de uma caixa nas demais; desfaz se
+    # não couber tudo.
+    origem = caixas[indice]
+    movimentos = []
+    for nome, quantidade in sorted(origem.conteudo.items(), key=lambda par: -skus_por_nome[par[0]]["fracao"]):
+        sku = skus_por_nome[nome]
+        for destino in caixas:
+            if destino is origem or not quantidade:
+                continue
+            n = destino.cabe(sku, quantidade)
+            if n:
+                destino.adicionar(sku, n)
+                movimentos.append((destino, sku, n))
+                quantidade -= n
+        if quantidade:
+            for destino, sku_movido, n in movimentos:
+                destino.remover(sku_movido, n)
+            return False
+    del caixas[indice]
+    return True
+
+def melhorar_por_busca_local(caixas, skus_por_nome, max_iteracoes=50):
+    # Repetidamente tenta eliminar a caixa menos ocupada
+    for _ in range(max_iteracoes):
+        if len(caixas) < 2:
+            break
+        candidatas = sorted(range(len(caixas)), key=lambda i: max(caixas[i].ocupacao, caixas[i].peso / caixas[i].max_peso))
+        if not any(_esvaziar_caixa(caixas, i, skus_por_nome) for i in candidatas[:3]):
+            break
+    return caixas
+
+def consolidar_skus(skus, master_altura, master_largura, master_profundidade, master_max_peso, busca_local=True):
+    # skus: [{"sku", "item_altura", "item_largura", "item_profundidade",
+    #         "item_peso", "item_preco", "item_quantidade"}, ...]
+    # Retorna (boxes, conteudos): boxes no formato de calcular_frete_formal()
+    # e, para cada caixa, o dicionário {sku: quantidade}.
+    skus = _preparar_skus(skus, master_altura, master_largura, master_profundidade, master_max_peso)
+    skus_por_nome = {sku["sku"]: sku for sku in skus}
+    ordenados = sorted(skus, key=lambda s: max(s["fracao"], s["item_peso"] / master_max_peso), reverse=True)
+    caixas = []
+    for sku in ordenados:
+        _primeiro_encaixe(caixas, master_max_peso, sku, int(sku["item_quantidade"]))
+    if busca_local:
+        melhorar_por_busca_local(caixas, skus_por_nome)
+    boxes = [{
+        "name": f"Caixa {i+1}",
+        "height": master_altura,
+        "width": master_largura,
+        "depth": master_profundidade,
+        "weight": round(caixa.peso, 6),
+        "price": round(caixa.valor, 6)
+    } for i, caixa in enumerate(caixas)]
+    return boxes, [dict(caixa.conteudo) for caixa in caixas]
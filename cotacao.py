@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from decouple import config
+import cliente_http
+
+API_KEY = config("SHIPSMART_API_KEY")
+URL_COTACAO = "https://api.shipsmart.com.br/v2/quotation?level=simple"
+
+# Validade (em segundos) e tamanho máximo do cache de cotações
+COTACAO_CACHE_TTL = config("COTACAO_CACHE_TTL", default=15 * 60, cast=int)
+COTACAO_CACHE_MAX = config("COTACAO_CACHE_MAX", default=2048, cast=int)
+# Máximo de caixas por requisição e requisições simultâneas por embarque
+COTACAO_MAX_CAIXAS = config("COTACAO_MAX_CAIXAS", default=100, cast=int)
+COTACAO_BLOCOS_SIMULTANEOS = config("COTACAO_BLOCOS_SIMULTANEOS", default=8, cast=int)
+
+# -------------------------
+# CACHE DE COTAÇÕES
+# -------------------------
+# Compartilhado por todas as sessões do processo. A chave é um hash do
+# payload canônico (rota + caixas), então cliques repetidos ou a mesma
+# consulta feita por outro analista não chegam à API.
+class CacheCotacoes:
+    def __init__(self, ttl=COTACAO_CACHE_TTL, tamanho_maximo=COTACAO_CACHE_MAX):
+        self.ttl = ttl
+        self.tamanho_maximo = tamanho_maximo
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.expirados = 0
+        self.removidos = 0
+
+    def obter(self, chave):
+        agora = time.monotonic()
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                self.falhas += 1
+                return None
+            gravado_em, valor = item
+            if agora - gravado_em > self.ttl:
+                del self._itens[chave]
+                self.expirados += 1
+                self.falhas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return valor
+
+    def gravar(self, chave, valor):
+        with self._lock:
+            self._itens[chave] = (time.monotonic(), valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.tamanho_maximo:
+                self._itens.popitem(last=False)
+                self.removidos += 1
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                "itens": len(self._itens),
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "expirados": self.expirados,
+                "removidos": self.removidos,
+                "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+            }
+
+cache_cotacoes = CacheCotacoes()
+
+def _normalizar(valor):
+    # 10 e 10.0 devem gerar a mesma chave
+    if isinstance(valor, bool) or valor is None or isinstance(valor, str):
+        return valor
+    if isinstance(valor, (int, float)):
+        return round(float(valor), 6)
+    if isinstance(valor, dict):
+        return {k: _normalizar(v) for k, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_normalizar(v) for v in valor]
+    return valor
+
+def chave_cotacao(payload, url=URL_COTACAO):
+    # O nome de cada caixa ("Caixa 3") não altera o preço e fica fora da chave
+    canonico = _normalizar(payload)
+    canonico["boxes"] = [{k: v for k, v in caixa.items() if k != "name"} for caixa in canonico.get("boxes", [])]
+    texto = json.dumps([url, canonico], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+# -------------------------
+# CHAMADAS À API SHIPSMART
+# -------------------------
+def montar_payload(boxes, **opcoes):
+    payload = {
+        "object": "not_doc",
+        "type": "simple",
+        "tax": "receiver",
+        "insurance": False,
+        "currency_quote": "USD",
+        "currency_payment": "USD",
+        "address_sender": {"country_code": "BR"},
+        "address_receiver": {"country_code": "US"},
+    }
+    payload.update(opcoes)
+    # LoteCaixas (embalagem.py) só vira lista de dicionários aqui
+    payload["boxes"] = boxes.para_payload() if hasattr(boxes, "para_payload") else boxes
+    return payload
+
+def cotar_transportadoras(payload, usar_cache=True):
+    # Retorna a lista de transportadoras [{"name", "currency_payment_amount", ...}]
+    # ou None se a cotação falhar. Falhas não são guardadas no cache.
+    chave = chave_cotacao(payload) if usar_cache else None
+    if usar_cache:
+        transportadoras = cache_cotacoes.obter(chave)
+        if transportadoras is not None:
+            return transportadoras
+    headers = {"Authorization": f"Bearer {API_KEY}", "Content-Type": "application/json"}
+    try:
+        response = cliente_http.post(URL_COTACAO, headers=headers, json=payload)
+    except requests.RequestException:
+        return None
+    if response.status_code == 200:
+        dados = response.json()
+        if "data" in dados and dados["data"].get("carriers"):
+            transportadoras = dados["data"]["carriers"]
+            if usar_cache:
+                cache_cotacoes.gravar(chave, transportadoras)
+            return transportadoras
+    return None
+
+def frete_mais_barato(transportadoras):
+    if not transportadoras:
+        return None, None
+    melhor = min(transportadoras, key=lambda x: float(x["currency_payment_amount"]))
+    return melhor["name"], float(melhor["currency_payment_amount"])
+
+# -------------------------
+# COTAÇÃO EM BLOCOS (EMBARQUES GRANDES)
+# -------------------------
+# Embarques com mais caixas que o limite da API são divididos em blocos,
+# cotados em paralelo. Blocos idênticos (ex.: blocos só de caixas cheias de
+# um LoteCaixas) são cotados uma única vez e multiplicados. Os totais são
+# somados por transportadora, considerando só as que atendem todos os
+# blocos, e a mais barata é escolhida sobre o embarque inteiro, de modo
+# que todos os blocos usem a mesma transportadora.
+_executor_blocos = ThreadPoolExecutor(max_workers=COTACAO_BLOCOS_SIMULTANEOS, thread_name_prefix="cotacao")
+
+def dividir_em_blocos(boxes, tamanho_bloco=COTACAO_MAX_CAIXAS):
+    # Retorna [(caixas_do_bloco, repeticoes)], sem repetir blocos iguais
+    grupos = {}
+    total = len(boxes)
+    for inicio in range(0, total, tamanho_bloco):
+        fim = min(inicio + tamanho_bloco, total)
+        if hasattr(boxes, "para_payload"):
+            # Assinatura barata do bloco: caixas cheias e se contém o restante
+            assinatura = (max(0, min(fim, boxes.caixas_cheias) - inicio), fim > boxes.caixas_cheias)
+            if assinatura not in grupos:
+                grupos[assinatura] = [boxes.para_payload(inicio, fim), 0]
+        else:
+            bloco = list(boxes[inicio:fim])
+            assinatura = chave_cotacao(montar_payload(bloco))
+            if assinatura not in grupos:
+                grupos[assinatura] = [bloco, 0]
+        grupos[assinatura][1] += 1
+    return [tuple(grupo) for grupo in grupos.values()]
+
+def cotar_em_blocos(boxes, tamanho_bloco=COTACAO_MAX_CAIXAS):
+    blocos = dividir_em_blocos(boxes, tamanho_bloco)
+    cotacoes = list(_executor_blocos.map(lambda bloco: cotar_transportadoras(montar_payload(bloco[0])), blocos))
+    return somar_por_transportadora(cotacoes, [repeticoes for _, repeticoes in blocos])
+
+def somar_por_transportadora(cotacoes, repeticoes):
+    # Soma cotações parciais (ponderadas pelas repetições) das transportadoras
+    # presentes em todas elas; None se alguma parte não tiver cotação
+    if any(not transportadoras for transportadoras in cotacoes):
+        return None
+    totais = None
+    for vezes, transportadoras in zip(repeticoes, cotacoes):
+        valores = {t["name"]: float(t["currency_payment_amount"]) * vezes for t in transportadoras}
+        if totais is None:
+            totais = valores
+        else:
+            totais = {nome: totais[nome] + valores[nome] for nome in totais if nome in valores}
+    if not totais:
+        return None
+    return [{"name": nome, "currency_payment_amount": valor} for nome, valor in totais.items()]
+
+def cotar_caixas(boxes, tamanho_bloco=COTACAO_MAX_CAIXAS):
+    # Transportadoras e valores para o embarque inteiro, em blocos se preciso
+    if len(boxes) > tamanho_bloco:
+        return cotar_em_blocos(boxes, tamanho_bloco)
+    return cotar_transportadoras(montar_payload(boxes))
+
+def calcular_frete_formal(boxes):
+    return frete_mais_barato(cotar_caixas(boxes))
+
+# -------------------------
+# FRETE D2C
+# -------------------------
+# No D2C cada pacote é enviado e cobrado separadamente, então a cotação de
+# N pacotes iguais é N vezes a de um pacote. Só os formatos distintos
+# (dimensões, peso e valor) são cotados, um pacote por requisição, e o
+# resultado de cada um é multiplicado pelo número de pacotes com esse formato.
+CAMPOS_PACOTE = ("height", "width", "depth", "weight", "price")
+
+def cotar_pacotes_d2c(pacotes):
+    # pacotes: [{"height", "width", "depth", "weight", "price"[, "quantidade"]}]
+    formatos = {}
+    for pacote in pacotes:
+        formato = tuple(pacote[campo] for campo in CAMPOS_PACOTE)
+        formatos[formato] = formatos.get(formato, 0) + int(pacote.get("quantidade", 1))
+
+    def cotar_formato(formato):
+        pacote = dict(zip(CAMPOS_PACOTE, formato), name="Pacote 1")
+        return cotar_transportadoras(montar_payload([pacote], residential_delivery=False, non_stackable=False))
+
+    cotacoes = list(_executor_blocos.map(cotar_formato, formatos))
+    return somar_por_transportadora(cotacoes, list(formatos.values()))
+
+def calcular_frete_d2c_pacotes(pacotes):
+    return frete_mais_barato(cotar_pacotes_d2c(pacotes))
+
+def calcular_frete_d2c(altura, largura, profundidade, peso, preco, quantidade):
+    return calcular_frete_d2c_pacotes([{
+        "height": altura,
+        "width": largura,
+        "depth": profundidade,
+        "weight": peso,
+        "price": preco,
+        "quantidade": quantidade
+    }])
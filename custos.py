@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+# Valor total do embarque abaixo do qual não há imposto de importação (de minimis)
+LIMITE_DE_MINIMIS = 800
+
+# Rótulos da memória de cálculo exibida no app
+ROTULOS_BREAKDOWN = {
+    "frete_total": "Frete Formal Total",
+    "total_itens": "Quantidade de Itens",
+    "frete_por_item": "Custo de Frete por Item",
+    "imposto_por_item": "Imposto por Item",
+    "armazenagem_total": "Custo de Armazenagem Total",
+    "armazenagem_por_item": "Custo de Armazenagem por Item",
+    "frete_local_total": "Custo de Frete Local Total",
+    "frete_local_por_item": "Custo de Frete Local por Item",
+    "formal_por_item": "Total Formal por Item",
+}
+
+# -------------------------
+# IMPOSTO ESPECÍFICO
+# -------------------------
+# Alíquotas específicas ("2.3¢/kg", "30 cents each", "$1.25/t") já chegam
+# do ETL como valor em USD por unidade. O valor por item sai do peso do item
+# ou da contagem; unidades que não derivam de nenhum dos dois (litros, m²)
+# retornam None, e quem chama usa o AVE da linha.
+FATORES_PESO = {"kg": 1.0, "g": 1000.0, "t": 0.001}
+FATORES_CONTAGEM = {"un": 1.0, "par": 1.0, "dz": 1 / 12, "gross": 1 / 144, "mil": 1 / 1000}
+
+def imposto_especifico_por_item(especifico, unidade, item_peso):
+    if not especifico:
+        return 0.0
+    if unidade in FATORES_PESO:
+        return especifico * FATORES_PESO[unidade] * np.asarray(item_peso, dtype=float)
+    if unidade in FATORES_CONTAGEM:
+        return especifico * FATORES_CONTAGEM[unidade]
+    return None
+
+# -------------------------
+# CUSTO DA EXPORTAÇÃO FORMAL (VETORIZADO)
+# -------------------------
+# Todos os argumentos aceitam escalares ou arrays NumPy (com broadcasting),
+# permitindo avaliar centenas de milhares de cenários numa única chamada.
+#   frete_total  -> frete formal consolidado (USD) de cada embarque
+#   total_itens  -> itens efetivamente nas caixas (padrão: item_quantidade)
+#   imposto_especifico -> parcela específica do imposto, em USD por item
+def calcular_custos_formal_vetorizado(item_preco, item_quantidade, tax_rate, frete_total,
+                                      armazenagem=0.0, frete_local=0.0, total_itens=None,
+                                      imposto_especifico=0.0):
+    item_preco = np.asarray(item_preco, dtype=float)
+    item_quantidade = np.asarray(item_quantidade, dtype=float)
+    tax_rate = np.asarray(tax_rate, dtype=float)
+    frete_total = np.asarray(frete_total, dtype=float)
+    armazenagem = np.asarray(armazenagem, dtype=float)
+    frete_local = np.asarray(frete_local, dtype=float)
+    imposto_especifico = np.asarray(imposto_especifico, dtype=float)
+    total_itens = item_quantidade if total_itens is None else np.asarray(total_itens, dtype=float)
+
+    valor_total_itens = item_preco * item_quantidade
+    imposto_por_item = np.where(valor_total_itens < LIMITE_DE_MINIMIS, 0.0, tax_rate * item_preco + imposto_especifico)
+    armazenagem_total = armazenagem * total_itens
+    frete_local_total = frete_local * total_itens
+    custo_total = frete_total + imposto_por_item * total_itens + armazenagem_total + frete_local_total
+    return {
+        "frete_total": np.broadcast_to(frete_total, custo_total.shape),
+        "total_itens": np.broadcast_to(total_itens, custo_total.shape),
+        "frete_por_item": frete_total / total_itens,
+        "imposto_por_item": np.broadcast_to(imposto_por_item, custo_total.shape),
+        "armazenagem_total": np.broadcast_to(armazenagem_total, custo_total.shape),
+        "armazenagem_por_item": np.broadcast_to(armazenagem, custo_total.shape),
+        "frete_local_total": np.broadcast_to(frete_local_total, custo_total.shape),
+        "frete_local_por_item": np.broadcast_to(frete_local, custo_total.shape),
+        "custo_total": custo_total,
+        "formal_por_item": custo_total / total_itens,
+    }
+
+# -------------------------
+# CUSTO DA EXPORTAÇÃO FORMAL (UM CENÁRIO)
+# -------------------------
+def calcular_breakdown_formal(valor, total_items, dados):
+    # valor: frete formal consolidado (USD) para todas as caixas
+    custos = calcular_custos_formal_vetorizado(
+        dados["item_preco"],
+        dados["item_quantidade"],
+        dados["tax_rate"],
+        valor,
+        dados["armazenagem"],
+        dados["frete_local"],
+        total_items,
+        dados.get("imposto_especifico", 0.0),
+    )
+    return {rotulo: float(custos[chave]) for chave, rotulo in ROTULOS_BREAKDOWN.items()}
+
+def total_itens_nas_caixas(boxes, item_preco):
+    if hasattr(boxes, "total_itens"):
+        return boxes.total_itens
+    return sum([box["price"] / item_preco for box in boxes])
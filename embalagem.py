@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import permutations
+import math
+import numpy as np
+
+# -------------------------
+# EMPACOTAMENTO 3D (GUILHOTINA POR CAMADAS)
+# -------------------------
+# Quantos itens cabem de fato numa caixa master, considerando a geometria:
+# para cada uma das 6 rotações do item, preenche um bloco em grade e
+# empacota recursivamente as sobras com cortes guilhotina nas 6 ordens
+# possíveis. Cada dimensão é antes reduzida ao maior comprimento que uma
+# combinação de lados do item consegue ocupar (tabela pré-calculada por
+# dimensão), o que não altera o resultado e aumenta o reaproveitamento da
+# memoização.
+
+# Folga para erros de ponto flutuante na conversão (ex.: 0.3 * 10)
+EPSILON_MEDIDA = 1e-6
+
+def _escala(*medidas):
+    # Medidas inteiras (cm) usam escala 1; com decimais, trabalhamos em mm
+    return 1 if all(float(m).is_integer() for m in medidas) else 10
+
+def _tabela_dimensao(comprimento, lados):
+    # reduzido[x] = maior y <= x que é soma de lados do item
+    alcancavel = bytearray(comprimento + 1)
+    alcancavel[0] = 1
+    reduzido = [0] * (comprimento + 1)
+    maior = 0
+    for x in range(1, comprimento + 1):
+        if any(x >= lado and alcancavel[x - lado] for lado in lados):
+            alcancavel[x] = 1
+            maior = x
+        reduzido[x] = maior
+    return reduzido
+
+def _sobras(dimensoes, usado, ordem):
+    restante = list(dimensoes)
+    sobras = []
+    for eixo in ordem:
+        sobra = list(restante)
+        sobra[eixo] = restante[eixo] - usado[eixo]
+        if sobra[eixo] > 0:
+            sobras.append(tuple(sobra))
+        restante[eixo] = usado[eixo]
+    return sobras
+
+@lru_cache(maxsize=256)
+def capacidade_geometrica(item_altura, item_largura, item_profundidade,
+                          master_altura, master_largura, master_profundidade):
+    escala = _escala(item_altura, item_largura, item_profundidade,
+                     master_altura, master_largura, master_profundidade)
+    # Na grade inteira o item é arredondado para cima e a caixa para baixo,
+    # para nunca declarar uma capacidade que não cabe nas medidas reais
+    item = tuple(math.ceil(m * escala - EPSILON_MEDIDA) for m in (item_altura, item_largura, item_profundidade))
+    caixa = tuple(math.floor(m * escala + EPSILON_MEDIDA) for m in (master_altura, master_largura, master_profundidade))
+    if min(item) <= 0:
+        return 0
+    lados = sorted(set(item))
+    tabelas = {c: _tabela_dimensao(c, lados) for c in set(caixa)}
+    rotacoes = sorted(set(permutations(item)))
+    ordens = list(permutations(range(3)))
+    volume_item = item[0] * item[1] * item[2]
+    memo = {}
+
+    def reduzir(dimensoes):
+        reduzidas = []
+        for d in dimensoes:
+            tabela = tabelas.get(d)
+            if tabela is None:
+                tabela = tabelas[d] = _tabela_dimensao(d, lados)
+            reduzidas.append(tabela[d])
+        return tuple(sorted(reduzidas))
+
+    def empacotar(dimensoes):
+        dimensoes = reduzir(dimensoes)
+        if dimensoes in memo:
+            return memo[dimensoes]
+        limite = (dimensoes[0] * dimensoes[1] * dimensoes[2]) // volume_item
+        melhor = 0
+        for rotacao in rotacoes:
+            contagem = [d // lado for d, lado in zip(dimensoes, rotacao)]
+            if 0 in contagem:
+                continue
+            usado = [n * lado for n, lado in zip(contagem, rotacao)]
+            bloco = contagem[0] * contagem[1] * contagem[2]
+            for ordem in ordens:
+                total = bloco + sum(empacotar(sobra) for sobra in _sobras(dimensoes, usado, ordem))
+                if total > melhor:
+                    melhor = total
+                if melhor == limite:
+                    break
+            if melhor == limite:
+                break
+        memo[dimensoes] = melhor
+        return melhor
+
+    return empacotar(caixa)
+
+def capacidade_caixa(item_altura, item_largura, item_profundidade, item_peso,
+                     master_altura, master_largura, master_profundidade, master_max_peso):
+    cap_by_geometry = capacidade_geometrica(item_altura, item_largura, item_profundidade,
+                                            master_altura, master_largura, master_profundidade)
+    cap_by_weight = master_max_peso // item_peso
+    capacity = int(min(cap_by_geometry, cap_by_weight))
+    # Item que não cabe (ou excede o peso) segue sozinho em uma caixa
+    return capacity if capacity > 0 else 1
+
+# -------------------------
+# CAIXA MASTER
+# -------------------------
+# Todas as caixas de um embarque homogêneo são iguais, exceto talvez a
+# última. Em vez de um dicionário por caixa, guardamos N caixas cheias +
+# 1 caixa com o restante; a lista de dicionários da API só é montada em
+# para_payload(), e totais/contagens saem em O(1).
+@dataclass(frozen=True)
+class LoteCaixas:
+    capacidade: int
+    caixas_cheias: int
+    itens_restantes: int
+    altura: float
+    largura: float
+    profundidade: float
+    item_peso: float
+    item_preco: float
+
+    def __len__(self):
+        return self.caixas_cheias + (1 if self.itens_restantes else 0)
+
+    def __iter__(self):
+        return iter(self.para_payload())
+
+    def grupos(self):
+        # (quantidade de caixas, itens por caixa)
+        grupos = []
+        if self.caixas_cheias:
+            grupos.append((self.caixas_cheias, self.capacidade))
+        if self.itens_restantes:
+            grupos.append((1, self.itens_restantes))
+        return grupos
+
+    def caixa(self, nome, itens):
+        return {
+            "name": nome,
+            "height": self.altura,
+            "width": self.largura,
+            "depth": self.profundidade,
+            "weight": itens * self.item_peso,
+            "price": itens * self.item_preco
+        }
+
+    @property
+    def total_itens(self):
+        return self.caixas_cheias * self.capacidade + self.itens_restantes
+
+    @property
+    def peso_total(self):
+        return self.total_itens * self.item_peso
+
+    @property
+    def valor_total(self):
+        return self.total_itens * self.item_preco
+
+    def para_payload(self, inicio=0, fim=None):
+        # Expande as caixas [inicio, fim) no formato do campo "boxes" da API
+        fim = len(self) if fim is None else min(fim, len(self))
+        return [self.caixa(f"Caixa {i+1}", self.capacidade if i < self.caixas_cheias else self.itens_restantes)
+                for i in range(inicio, fim)]
+
+    def resumo(self):
+        # Uma linha por tipo de caixa, para exibição
+        return [{
+            "Caixas": quantidade,
+            "Itens por caixa": itens,
+            "Altura": self.altura,
+            "Largura": self.largura,
+            "Profundidade": self.profundidade,
+            "Peso por caixa (kg)": itens * self.item_peso,
+            "Valor por caixa (USD)": itens * self.item_preco,
+        } for quantidade, itens in self.grupos()]
+
+def calcular_caixa_master(item_altura, item_largura, item_profundidade, item_peso, item_quantidade, item_preco,
+                          master_altura, master_largura, master_profundidade, master_max_peso):
+    capacity = capacidade_caixa(item_altura, item_largura, item_profundidade, item_peso,
+                                master_altura, master_largura, master_profundidade, master_max_peso)
+    num_boxes = int(np.ceil(item_quantidade / capacity))
+    total_weight = item_quantidade * item_peso
+    boxes = LoteCaixas(capacity, item_quantidade // capacity, item_quantidade % capacity,
+                       master_altura, master_largura, master_profundidade, item_peso, item_preco)
+    return num_boxes, total_weight, capacity, boxes
+
+def caixa_master_dos_dados(dados):
+    return calcular_caixa_master(
+        dados["item_altura"],
+        dados["item_largura"],
+        dados["item_profundidade"],
+        dados["item_peso"],
+        dados["item_quantidade"],
+        dados["item_preco"],
+        dados["master_altura"],
+        dados["master_largura"],
+        dados["master_profundidade"],
+        dados["master_max_peso"]
+    )
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+import math
+from cotacao import calcular_frete_formal
+from comparacao import cotar_d2c
+from custos import LIMITE_DE_MINIMIS, calcular_custos_formal_vetorizado
+from embalagem import caixa_master_dos_dados
+
+# -------------------------
+# PONTO DE EQUILÍBRIO D2C x FORMAL
+# -------------------------
+# O custo formal por item cai com a quantidade (o frete consolidado é
+# diluído), mas em degraus: cada caixa nova adiciona frete, e ao passar de
+# US$ 800 o imposto de importação passa a valer. Em vez de cotar cada
+# quantidade, a busca é feita por bisseção em dois níveis:
+#   1. no número de caixas cheias (q = n * capacidade), onde o custo por
+#      item é mínimo dentro de cada degrau;
+#   2. dentro do degrau encontrado, na quantidade da última caixa.
+# Cada avaliação é uma cotação (reaproveitada pelo cache de cotações), então
+# o total fica em torno de log2(caixas) + log2(capacidade) chamadas.
+# Logo após o equilíbrio, quantidades que abrem uma caixa nova quase vazia
+# ainda podem favorecer o D2C por alguns itens: o degrau é inerente ao frete.
+# As faixas sem imposto (abaixo de US$ 800) e com imposto são buscadas
+# sempre, cada uma por conta própria: o Formal pode vencer só abaixo do
+# limite de minimis, só acima dele, ou nas duas faixas.
+
+class AvaliadorFormal:
+    def __init__(self, dados, cotar=calcular_frete_formal):
+        self.dados = dados
+        self.cotar = cotar
+        self.cotacoes = 0
+        self._memo = {}
+        _, _, self.capacidade, _ = caixa_master_dos_dados(dict(dados, item_quantidade=1))
+
+    def custo_por_item(self, quantidade):
+        if quantidade not in self._memo:
+            dados = dict(self.dados, item_quantidade=quantidade)
+            _, _, _, boxes = caixa_master_dos_dados(dados)
+            self.cotacoes += 1
+            _, valor = self.cotar(boxes)
+            if valor is None:
+                self._memo[quantidade] = None
+            else:
+                custos = calcular_custos_formal_vetorizado(
+                    dados["item_preco"], quantidade, dados["tax_rate"], valor,
+                    dados["armazenagem"], dados["frete_local"],
+                    imposto_especifico=dados.get("imposto_especifico", 0.0)
+                )
+                self._memo[quantidade] = float(custos["formal_por_item"])
+        return self._memo[quantidade]
+
+def _menor_satisfazendo(inicio, fim, condicao):
+    # Menor x em [inicio, fim] com condicao(x) verdadeira, supondo que ela
+    # seja monótona (falsa ... falsa, verdadeira ... verdadeira). None se
+    # nem o fim satisfaz.
+    if inicio > fim or not condicao(fim):
+        return None
+    while inicio < fim:
+        meio = (inicio + fim) // 2
+        if condicao(meio):
+            fim = meio
+        else:
+            inicio = meio + 1
+    return inicio
+
+def _equilibrio_no_intervalo(avaliador, inicio, fim, limite):
+    def mais_barato(q):
+        custo = avaliador.custo_por_item(q)
+        return custo is not None and custo <= limite
+
+    capacidade = avaliador.capacidade
+    # Nível 1: degraus de caixas cheias dentro do intervalo
+    n_inicio = max(1, math.ceil(inicio / capacidade))
+    n_fim = max(n_inicio, fim // capacidade)
+    ponto = lambda n: min(max(n * capacidade, inicio), fim)
+    n = _menor_satisfazendo(n_inicio, n_fim, lambda n: mais_barato(ponto(n)))
+    if n is None:
+        # Pode haver equilíbrio no degrau parcial final (fim fora de um múltiplo)
+        return _menor_satisfazendo(max(inicio, n_fim * capacidade + 1), fim, mais_barato)
+    # Nível 2: quantidade dentro do degrau da n-ésima caixa
+    degrau_inicio = max(inicio, (n - 1) * capacidade + 1)
+    return _menor_satisfazendo(degrau_inicio, ponto(n), mais_barato)
+
+def quantidade_equilibrio(dados, quantidade_maxima=10000, cotar=calcular_frete_formal, frete_d2c=None):
+    # Menor quantidade a partir da qual o Formal fica mais barato que o D2C
+    # (por item), considerando o salto do imposto no limite de minimis.
+    if frete_d2c is None:
+        _, frete_d2c = cotar_d2c(dados)
+    if frete_d2c is None:
+        return None
+    avaliador = AvaliadorFormal(dados, cotar)
+    quantidade_tributada = max(1, math.ceil(LIMITE_DE_MINIMIS / dados["item_preco"]))
+    sem_imposto = com_imposto = None
+    if quantidade_tributada > 1:
+        sem_imposto = _equilibrio_no_intervalo(avaliador, 1, min(quantidade_tributada - 1, quantidade_maxima), frete_d2c)
+    if quantidade_tributada <= quantidade_maxima:
+        com_imposto = _equilibrio_no_intervalo(avaliador, quantidade_tributada, quantidade_maxima, frete_d2c)
+    quantidade = sem_imposto if sem_imposto is not None else com_imposto
+    return {
+        "quantidade_equilibrio": quantidade,
+        # Equilíbrio em cada faixa; o Formal pode deixar de vencer ao
+        # passar do limite de minimis (sem_imposto sem com_imposto, ou
+        # com_imposto bem depois do limite)
+        "equilibrio_sem_imposto": sem_imposto,
+        "equilibrio_com_imposto": com_imposto,
+        "quantidade_tributada": quantidade_tributada,
+        "custo_formal_por_item": avaliador.custo_por_item(quantidade) if quantidade else None,
+        "custo_d2c_por_item": frete_d2c,
+        "capacidade_caixa": avaliador.capacidade,
+        "cotacoes": avaliador.cotacoes,
+    }
+
+def preco_equilibrio(dados, cotar=calcular_frete_formal, frete_d2c=None):
+    # Para a quantidade informada, preço unitário acima do qual o D2C passa
+    # a ser mais barato. Os fretes não dependem do preço declarado (cotação
+    # sem seguro), então bastam uma cotação de cada modelo e a conta é direta:
+    #   formal(p) = frete/q + armazenagem + frete_local + tax_rate * p + específico  (se q*p >= 800)
+    if frete_d2c is None:
+        _, frete_d2c = cotar_d2c(dados)
+    _, _, _, boxes = caixa_master_dos_dados(dados)
+    _, frete_formal = cotar(boxes)
+    if frete_d2c is None or frete_formal is None:
+        return None
+    quantidade = dados["item_quantidade"]
+    base = frete_formal / quantidade + dados["armazenagem"] + dados["frete_local"]
+    especifico = dados.get("imposto_especifico", 0.0)
+    if base > frete_d2c:
+        # Mesmo sem imposto o Formal é mais caro: o D2C vence a qualquer preço
+        preco = 0.0
+    elif dados["tax_rate"] <= 0:
+        # Só o imposto específico (fixo por item) entra acima do limite de minimis
+        preco = LIMITE_DE_MINIMIS / quantidade if base + especifico > frete_d2c else math.inf
+    else:
+        # Se a folga for menor que o salto do imposto no limite de minimis,
+        # o D2C passa a vencer exatamente nesse limite
+        preco = max(LIMITE_DE_MINIMIS / quantidade, (frete_d2c - base - especifico) / dados["tax_rate"])
+    return {
+        "preco_equilibrio": preco,
+        "custo_formal_sem_imposto": base,
+        "custo_d2c_por_item": frete_d2c,
+    }
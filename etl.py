@@ -0,0 +1,413 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from openpyxl import load_workbook
+from etl_comum import (COLUNAS_MIGRAVEIS, preparar_banco, recriar_tabela, criar_indices, criar_fts,
+                       garantir_gatilhos_fts, criar_mapa_hs6, criar_loja_tarifas, finalizar_banco, incrementar_versao,
+                       escrever_snapshot, converter_numero)
+from referencia import (BASE_DIR, NCM_DB, USA_DB, TARIFAS_DB, SNAPSHOT_NCM, PARCEIRO_NMF,
+                        COLUNAS_SNAPSHOT, normalizar_codigo)
+from tarifas import analisar_taxa
+
+# -------------------------
+# ETL INCREMENTAL DAS PLANILHAS DE TARIFAS
+# -------------------------
+# A aba "Data" é lida em modo streaming (openpyxl read_only), linha a linha.
+# Cada linha recebe um hash do conteúdo (row_hash) e é comparada com o que já
+# está no banco pela chave product_code: só linhas novas são inseridas, só
+# linhas com hash diferente são atualizadas e os códigos que sumiram da
+# planilha são excluídos. A gravação é feita em lotes, cada um na sua
+# transação; rodar de novo após uma falha completa o que faltou.
+# Alíquotas em texto (NavDuty, ex.: "30 cents each + 4.3%") são interpretadas
+# aqui, uma vez, nas colunas ad_valorem, especifico e unidade.
+# O índice FTS acompanha as alterações por gatilhos, e o mapa hs6_ave dos
+# EUA é recalculado quando algo mudou. Ao final da tabela ncm é gravado o
+# snapshot Arrow (se o pyarrow estiver instalado), mapeado em memória pelo app;
+# com --db, o snapshot vai ao lado do banco informado (BANCO.arrow).
+#
+# Uso: python etl.py {ncm,hs_codes} [--arquivo ARQ] [--db BANCO] [--completo]
+#      python etl.py tarifas [--arquivo ARQ ...] [--parceiro WLD] [--vigencia AAAA-MM-DD]
+
+TAMANHO_LOTE = 5000
+
+# Colunas da planilha -> colunas do banco, e a conversão de cada uma
+FONTES = {
+    "ncm": {
+        "arquivo": os.path.join(BASE_DIR, "Brazil 2024.xlsx"),
+        "db": NCM_DB,
+        "colunas": {
+            "ReportingCountry": "country",
+            "Year": "year",
+            "Revision": "revision",
+            "ProductCode": "product_code",
+            "ProductDescription": "product_description",
+            "NavDuty": "nav_duty",
+            "AVE": "ave",
+        },
+        "numericas": ("nav_duty", "ave"),
+        "mapa_hs6": False,
+        "snapshot": SNAPSHOT_NCM,
+    },
+    "hs_codes": {
+        "arquivo": os.path.join(BASE_DIR, "United States of America 2024.xlsx"),
+        "db": USA_DB,
+        "colunas": {
+            "Year": "year",
+            "Revision": "revision",
+            "ProductCode": "product_code",
+            "ProductDescription": "product_description",
+            "NavDuty": "nav_duty",
+            "AVE": "ave",
+        },
+        "numericas": ("ave",),
+        "taxa": "nav_duty",
+        "mapa_hs6": True,
+    },
+}
+
+# -------------------------
+# LEITURA EM STREAMING
+# -------------------------
+def ler_planilha(caminho, colunas, aba="Data"):
+    # Gera dicionários {coluna_do_banco: valor} sem carregar a aba inteira
+    livro = load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        linhas = livro[aba].iter_rows(values_only=True)
+        cabecalho = next(linhas, ())
+        posicoes = {colunas[nome]: i for i, nome in enumerate(cabecalho) if nome in colunas}
+        faltando = set(colunas.values()) - set(posicoes)
+        if faltando:
+            raise ValueError(f"Colunas ausentes na aba {aba}: {', '.join(sorted(faltando))}")
+        for linha in linhas:
+            if not any(valor is not None for valor in linha):
+                continue
+            yield {coluna: linha[i] if i < len(linha) else None for coluna, i in posicoes.items()}
+    finally:
+        livro.close()
+
+def converter_ano(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+def converter_texto(valor):
+    if valor is None:
+        return None
+    texto = str(valor).strip()
+    return texto or None
+
+def preparar_registro(registro, fonte):
+    registro = dict(registro)
+    for coluna, valor in registro.items():
+        if coluna == "year":
+            registro[coluna] = converter_ano(valor)
+        elif coluna in fonte["numericas"]:
+            registro[coluna] = converter_numero(valor)
+        else:
+            registro[coluna] = converter_texto(valor)
+    if not registro["product_code"]:
+        return None
+    registro["product_code"] = normalizar_codigo(registro["product_code"])
+    registro["hs6"] = registro["product_code"][:6]
+    if fonte.get("taxa"):
+        registro.update(analisar_taxa(registro[fonte["taxa"]]))
+    return registro
+
+def hash_registro(registro, colunas):
+    conteudo = json.dumps([registro[coluna] for coluna in colunas], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+# -------------------------
+# BANCO
+# -------------------------
+def abrir_banco(db_path, tabela, completo=False):
+    conn = sqlite3.connect(db_path)
+    existe = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (tabela,)).fetchone()
+    if completo or not existe:
+        preparar_banco(conn)
+        recriar_tabela(conn, tabela)
+        return conn, True
+    conn.execute("PRAGMA journal_mode=WAL")
+    # Bancos gerados por versões anteriores do ETL não têm as colunas novas
+    colunas = {linha[1] for linha in conn.execute(f"PRAGMA table_info({tabela})")}
+    for coluna, tipo in COLUNAS_MIGRAVEIS[tabela].items():
+        if coluna not in colunas:
+            conn.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {tipo}")
+    return conn, False
+
+def _gravar_lote(conn, tabela, colunas, insercoes, atualizacoes):
+    nomes = ", ".join(colunas)
+    marcadores = ", ".join("?" for _ in colunas)
+    atribuicoes = ", ".join(f"{coluna} = ?" for coluna in colunas)
+    with conn:
+        conn.executemany(f"INSERT INTO {tabela} ({nomes}) VALUES ({marcadores})", insercoes)
+        conn.executemany(f"UPDATE {tabela} SET {atribuicoes} WHERE id = ?", atualizacoes)
+    insercoes.clear()
+    atualizacoes.clear()
+
+def caminho_snapshot(fonte, db_path):
+    # O snapshot padrão pertence ao banco padrão (é o que o app carrega);
+    # outro banco ganha um snapshot ao lado, com o mesmo nome e extensão .arrow
+    if os.path.abspath(db_path) == os.path.abspath(fonte["db"]):
+        return fonte["snapshot"]
+    return os.path.splitext(db_path)[0] + ".arrow"
+
+def atualizar_tabela(tabela, arquivo=None, db_path=None, completo=False, tamanho_lote=TAMANHO_LOTE):
+    fonte = FONTES[tabela]
+    arquivo = arquivo or fonte["arquivo"]
+    db_path = db_path or fonte["db"]
+    relatorio = {"tabela": tabela, "lidas": 0, "inseridas": 0, "atualizadas": 0,
+                 "inalteradas": 0, "excluidas": 0, "duplicadas": 0, "ignoradas": 0, "tempos": {}}
+    tempos = relatorio["tempos"]
+
+    inicio = time.perf_counter()
+    conn, nova = abrir_banco(db_path, tabela, completo)
+    existentes = {codigo: (id_linha, row_hash) for id_linha, codigo, row_hash
+                  in conn.execute(f"SELECT id, product_code, row_hash FROM {tabela}")}
+    fts_existe = conn.execute("SELECT 1 FROM sqlite_master WHERE name=?", (f"{tabela}_fts",)).fetchone()
+    if fts_existe:
+        # Mantém o FTS sincronizado linha a linha durante a carga
+        with conn:
+            garantir_gatilhos_fts(conn, tabela)
+    tempos["abertura"] = time.perf_counter() - inicio
+
+    colunas = list(fonte["colunas"].values()) + ["hs6"]
+    if fonte.get("taxa"):
+        colunas += ["ad_valorem", "especifico", "unidade"]
+    colunas_gravadas = colunas + ["row_hash"]
+    insercoes, atualizacoes = [], []
+    vistos = set()
+    tempo_leitura = tempo_gravacao = 0.0
+    marca = time.perf_counter()
+    for bruto in ler_planilha(arquivo, fonte["colunas"]):
+        relatorio["lidas"] += 1
+        registro = preparar_registro(bruto, fonte)
+        if registro is None:
+            relatorio["ignoradas"] += 1
+            continue
+        codigo = registro["product_code"]
+        if codigo in vistos:
+            relatorio["duplicadas"] += 1
+            continue
+        vistos.add(codigo)
+        registro["row_hash"] = hash_registro(registro, colunas)
+        valores = [registro[coluna] for coluna in colunas_gravadas]
+        atual = existentes.get(codigo)
+        if atual is None:
+            insercoes.append(valores)
+            relatorio["inseridas"] += 1
+        elif atual[1] != registro["row_hash"]:
+            atualizacoes.append(valores + [atual[0]])
+            relatorio["atualizadas"] += 1
+        else:
+            relatorio["inalteradas"] += 1
+        if len(insercoes) + len(atualizacoes) >= tamanho_lote:
+            agora = time.perf_counter()
+            tempo_leitura += agora - marca
+            _gravar_lote(conn, tabela, colunas_gravadas, insercoes, atualizacoes)
+            marca = time.perf_counter()
+            tempo_gravacao += marca - agora
+    agora = time.perf_counter()
+    tempo_leitura += agora - marca
+    _gravar_lote(conn, tabela, colunas_gravadas, insercoes, atualizacoes)
+    tempos["leitura"] = tempo_leitura
+    tempos["gravacao"] = tempo_gravacao + time.perf_counter() - agora
+
+    inicio = time.perf_counter()
+    removidos = [(id_linha,) for codigo, (id_linha, _) in existentes.items() if codigo not in vistos]
+    with conn:
+        conn.executemany(f"DELETE FROM {tabela} WHERE id = ?", removidos)
+    relatorio["excluidas"] = len(removidos)
+    tempos["exclusao"] = time.perf_counter() - inicio
+
+    alterou = nova or relatorio["inseridas"] or relatorio["atualizadas"] or relatorio["excluidas"]
+    inicio = time.perf_counter()
+    with conn:
+        criar_indices(conn, tabela)
+        if not fts_existe:
+            criar_fts(conn, tabela)
+        elif alterou:
+            conn.execute(f"INSERT INTO {tabela}_fts({tabela}_fts) VALUES('optimize')")
+    tempos["indices"] = time.perf_counter() - inicio
+
+    if fonte["mapa_hs6"] and (alterou or not conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name='hs6_ave'").fetchone()):
+        inicio = time.perf_counter()
+        with conn:
+            relatorio["hs6"] = criar_mapa_hs6(conn)
+        tempos["mapa_hs6"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    if alterou:
+        incrementar_versao(conn)
+        finalizar_banco(conn)
+    tempos["finalizacao"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    if "snapshot" in fonte and escrever_snapshot(conn, tabela, COLUNAS_SNAPSHOT[tabela],
+                                                 caminho_snapshot(fonte, db_path)) is not None:
+        tempos["snapshot"] = time.perf_counter() - inicio
+    conn.close()
+    return relatorio
+
+# -------------------------
+# LOJA DE TARIFAS MULTIPAÍS
+# -------------------------
+# Carrega uma ou mais planilhas do WITS na loja tarifas.db. Cada combinação
+# (país, parceiro, ano, revisão) encontrada é uma versão; dentro de cada
+# versão vale a mesma carga incremental por hash das tabelas acima, e só as
+# versões presentes nas planilhas lidas são alteradas.
+ARQUIVOS_LOJA = [FONTES["ncm"]["arquivo"], FONTES["hs_codes"]["arquivo"]]
+
+# A coluna do país vem como "ReportingCountry" ou, em alguns downloads, "F"
+COLUNAS_LOJA = {
+    "ReportingCountry": "reporter",
+    "F": "reporter",
+    "Year": "year",
+    "Revision": "revision",
+    "ProductCode": "product_code",
+    "ProductDescription": "product_description",
+    "NavDuty": "nav_duty",
+    "AVE": "ave",
+}
+CODIGOS_PAIS = {
+    "Brazil": "BRA",
+    "United States of America": "USA",
+}
+
+def _versao_loja(conn, versoes, chave, vigencia):
+    # Obtém (ou cria) a versão e as linhas que ela já tem no banco
+    if chave not in versoes:
+        with conn:
+            linha = conn.execute("SELECT id FROM tarifa_versao WHERE reporter = ? AND partner = ? "
+                                 "AND year = ? AND revision = ?", chave).fetchone()
+            if linha is None:
+                versao_id = conn.execute("INSERT INTO tarifa_versao (reporter, partner, year, revision, valid_from) "
+                                         "VALUES (?, ?, ?, ?, ?)", chave + (vigencia,)).lastrowid
+            else:
+                versao_id = linha[0]
+                conn.execute("UPDATE tarifa_versao SET valid_from = ? WHERE id = ?", (vigencia, versao_id))
+        existentes = dict(conn.execute("SELECT product_code, row_hash FROM tarifa WHERE versao_id = ?", (versao_id,)))
+        versoes[chave] = {"id": versao_id, "existentes": existentes, "vistos": set()}
+    return versoes[chave]
+
+def _gravar_lote_loja(conn, insercoes, atualizacoes):
+    with conn:
+        conn.executemany("INSERT INTO tarifa (versao_id, product_code, hs6, product_description, nav_duty, ave, row_hash) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?)", insercoes)
+        conn.executemany("UPDATE tarifa SET hs6 = ?, product_description = ?, nav_duty = ?, ave = ?, row_hash = ? "
+                         "WHERE versao_id = ? AND product_code = ?", atualizacoes)
+    insercoes.clear()
+    atualizacoes.clear()
+
+def atualizar_loja(arquivos=None, db_path=TARIFAS_DB, parceiro=PARCEIRO_NMF, vigencia=None, tamanho_lote=TAMANHO_LOTE):
+    # vigencia: data ISO de início de vigência; padrão 1º de janeiro do ano da linha
+    relatorio = {"tabela": "tarifa", "lidas": 0, "inseridas": 0, "atualizadas": 0,
+                 "inalteradas": 0, "excluidas": 0, "duplicadas": 0, "ignoradas": 0, "tempos": {}}
+    tempos = relatorio["tempos"]
+
+    inicio = time.perf_counter()
+    conn = sqlite3.connect(db_path)
+    with conn:
+        criar_loja_tarifas(conn)
+    conn.execute("PRAGMA journal_mode=WAL")
+    tempos["abertura"] = time.perf_counter() - inicio
+
+    fonte = {"numericas": ("ave",)}
+    colunas = ["hs6", "product_description", "nav_duty", "ave", "row_hash"]
+    versoes = {}
+    insercoes, atualizacoes = [], []
+    tempo_leitura = tempo_gravacao = 0.0
+    marca = time.perf_counter()
+    for arquivo in arquivos or ARQUIVOS_LOJA:
+        for bruto in ler_planilha(arquivo, COLUNAS_LOJA):
+            relatorio["lidas"] += 1
+            registro = preparar_registro(bruto, fonte)
+            if registro is None or registro["year"] is None or not registro["reporter"]:
+                relatorio["ignoradas"] += 1
+                continue
+            registro["reporter"] = CODIGOS_PAIS.get(registro["reporter"], registro["reporter"])
+            chave = (registro["reporter"], parceiro, registro["year"], registro["revision"] or "")
+            versao = _versao_loja(conn, versoes, chave, vigencia or f"{registro['year']:04d}-01-01")
+            codigo = registro["product_code"]
+            if codigo in versao["vistos"]:
+                relatorio["duplicadas"] += 1
+                continue
+            versao["vistos"].add(codigo)
+            registro["row_hash"] = hash_registro(registro, ["product_code"] + colunas[:-1])
+            valores = [registro[coluna] for coluna in colunas]
+            if codigo not in versao["existentes"]:
+                insercoes.append([versao["id"], codigo] + valores)
+                relatorio["inseridas"] += 1
+            elif versao["existentes"][codigo] != registro["row_hash"]:
+                atualizacoes.append(valores + [versao["id"], codigo])
+                relatorio["atualizadas"] += 1
+            else:
+                relatorio["inalteradas"] += 1
+            if len(insercoes) + len(atualizacoes) >= tamanho_lote:
+                agora = time.perf_counter()
+                tempo_leitura += agora - marca
+                _gravar_lote_loja(conn, insercoes, atualizacoes)
+                marca = time.perf_counter()
+                tempo_gravacao += marca - agora
+    agora = time.perf_counter()
+    tempo_leitura += agora - marca
+    _gravar_lote_loja(conn, insercoes, atualizacoes)
+    tempos["leitura"] = tempo_leitura
+    tempos["gravacao"] = tempo_gravacao + time.perf_counter() - agora
+
+    inicio = time.perf_counter()
+    with conn:
+        for versao in versoes.values():
+            removidos = [(versao["id"], codigo) for codigo in versao["existentes"] if codigo not in versao["vistos"]]
+            conn.executemany("DELETE FROM tarifa WHERE versao_id = ? AND product_code = ?", removidos)
+            conn.execute("UPDATE tarifa_versao SET linhas = ? WHERE id = ?", (len(versao["vistos"]), versao["id"]))
+            relatorio["excluidas"] += len(removidos)
+    tempos["exclusao"] = time.perf_counter() - inicio
+    relatorio["versoes"] = len(versoes)
+
+    inicio = time.perf_counter()
+    if relatorio["inseridas"] or relatorio["atualizadas"] or relatorio["excluidas"]:
+        finalizar_banco(conn)
+    conn.close()
+    tempos["finalizacao"] = time.perf_counter() - inicio
+    return relatorio
+
+def imprimir_relatorio(relatorio):
+    print(f"📌 {relatorio['tabela']}: {relatorio['lidas']} linhas lidas | "
+          f"{relatorio['inseridas']} inseridas, {relatorio['atualizadas']} atualizadas, "
+          f"{relatorio['excluidas']} excluídas, {relatorio['inalteradas']} inalteradas"
+          + (f", {relatorio['duplicadas']} duplicadas" if relatorio["duplicadas"] else "")
+          + (f", {relatorio['ignoradas']} sem código" if relatorio["ignoradas"] else "")
+          + (f" | {relatorio['versoes']} versões" if "versoes" in relatorio else ""))
+    for etapa, segundos in relatorio["tempos"].items():
+        print(f"   {etapa:<12} {segundos:8.3f} s")
+    print(f"   {'total':<12} {sum(relatorio['tempos'].values()):8.3f} s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Atualiza os bancos de referência a partir das planilhas de tarifas.")
+    parser.add_argument("tabela", choices=sorted(FONTES) + ["tarifas"])
+    parser.add_argument("--arquivo", action="append",
+                        help="planilha .xlsx (padrão: a planilha de 2024 da tabela; em tarifas, pode repetir)")
+    parser.add_argument("--db", help="banco SQLite de destino")
+    parser.add_argument("--completo", action="store_true", help="recria a tabela do zero em vez de aplicar só as diferenças")
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE, help="linhas gravadas por transação")
+    parser.add_argument("--parceiro", default=PARCEIRO_NMF, help="parceiro das tarifas (tarifas; padrão: WLD, NMF)")
+    parser.add_argument("--vigencia", help="início de vigência AAAA-MM-DD (tarifas; padrão: 1º de janeiro do ano)")
+    args = parser.parse_args()
+    if args.tabela == "tarifas":
+        imprimir_relatorio(atualizar_loja(args.arquivo, args.db or TARIFAS_DB, args.parceiro, args.vigencia, args.lote))
+        return
+    if args.arquivo and len(args.arquivo) > 1:
+        parser.error("--arquivo só pode ser repetido com tarifas")
+    arquivo = args.arquivo[0] if args.arquivo else None
+    imprimir_relatorio(atualizar_tabela(args.tabela, arquivo, args.db, args.completo, args.lote))
+
+if __name__ == "__main__":
+    main()
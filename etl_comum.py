@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import statistics
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # snapshots Arrow são opcionais
+    pa = None
+
+# -------------------------
+# ESQUEMA DOS BANCOS DE REFERÊNCIA
+# -------------------------
+# Páginas maiores reduzem a profundidade das árvores B em leituras
+# sequenciais; WAL permite leitores concorrentes enquanto o ETL grava.
+PAGE_SIZE = 8192
+
+ESQUEMAS = {
+    "ncm": """
+        CREATE TABLE ncm (
+            id INTEGER PRIMARY KEY,
+            country TEXT,
+            year INTEGER,
+            revision TEXT,
+            product_code TEXT NOT NULL,
+            hs6 TEXT NOT NULL,
+            product_description TEXT,
+            nav_duty REAL,
+            ave REAL,
+            row_hash TEXT
+        )
+    """,
+    "hs_codes": """
+        CREATE TABLE hs_codes (
+            id INTEGER PRIMARY KEY,
+            year INTEGER,
+            revision TEXT,
+            product_code TEXT NOT NULL,
+            hs6 TEXT NOT NULL,
+            product_description TEXT,
+            nav_duty TEXT,
+            ave REAL,
+            ad_valorem REAL,
+            especifico REAL,
+            unidade TEXT,
+            row_hash TEXT
+        )
+    """,
+}
+
+# Colunas acrescentadas depois da primeira versão do esquema: bancos antigos
+# recebem-nas via ALTER TABLE na próxima carga
+COLUNAS_MIGRAVEIS = {
+    "ncm": {"row_hash": "TEXT"},
+    "hs_codes": {"ad_valorem": "REAL", "especifico": "REAL", "unidade": "TEXT", "row_hash": "TEXT"},
+}
+
+# -------------------------
+# LOJA DE TARIFAS MULTIPAÍS
+# -------------------------
+# Cada versão de tabela tarifária (país que aplica, parceiro, ano e revisão
+# do HS) vira uma linha de tarifa_versao com a data de início de vigência.
+# As linhas tarifárias ficam agrupadas fisicamente por versão e código
+# (WITHOUT ROWID), então "tarifa vigente em uma data" é uma busca no índice
+# de vigência seguida de uma busca pela chave primária, mesmo com dezenas
+# de milhões de linhas.
+ESQUEMAS_LOJA = {
+    "tarifa_versao": """
+        CREATE TABLE tarifa_versao (
+            id INTEGER PRIMARY KEY,
+            reporter TEXT NOT NULL,
+            partner TEXT NOT NULL,
+            year INTEGER NOT NULL,
+            revision TEXT NOT NULL,
+            valid_from TEXT NOT NULL,
+            linhas INTEGER NOT NULL DEFAULT 0,
+            UNIQUE (reporter, partner, year, revision)
+        )
+    """,
+    "tarifa": """
+        CREATE TABLE tarifa (
+            versao_id INTEGER NOT NULL REFERENCES tarifa_versao(id),
+            product_code TEXT NOT NULL,
+            hs6 TEXT NOT NULL,
+            product_description TEXT,
+            nav_duty TEXT,
+            ave REAL,
+            row_hash TEXT,
+            PRIMARY KEY (versao_id, product_code)
+        ) WITHOUT ROWID
+    """,
+}
+
+def criar_loja_tarifas(conn):
+    existentes = {linha[0] for linha in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    if not existentes:
+        preparar_banco(conn)
+        conn.execute("VACUUM")
+    for tabela, esquema in ESQUEMAS_LOJA.items():
+        if tabela not in existentes:
+            conn.execute(esquema)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tarifa_versao_vigencia ON tarifa_versao(reporter, partner, valid_from)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tarifa_hs6 ON tarifa(versao_id, hs6)")
+
+def preparar_banco(conn):
+    # page_size só tem efeito fora do modo WAL e após um VACUUM
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.execute(f"PRAGMA page_size={PAGE_SIZE}")
+
+def recriar_tabela(conn, tabela):
+    conn.execute(f"DROP TABLE IF EXISTS {tabela}_fts")
+    conn.execute(f"DROP TABLE IF EXISTS {tabela}")
+    conn.execute("VACUUM")
+    conn.execute(ESQUEMAS[tabela])
+
+def criar_indices(conn, tabela):
+    conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{tabela}_product_code ON {tabela}(product_code)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{tabela}_hs6 ON {tabela}(hs6)")
+
+def criar_fts(conn, tabela):
+    # Índice FTS5 de conteúdo externo sobre as descrições: o texto fica só na
+    # tabela base. remove_diacritics faz "calcados" casar com "calçados" e os
+    # índices de prefixo aceleram a busca enquanto o usuário digita.
+    conn.execute(f"DROP TABLE IF EXISTS {tabela}_fts")
+    conn.execute(f"""
+        CREATE VIRTUAL TABLE {tabela}_fts USING fts5(
+            product_description,
+            content='{tabela}',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    """)
+    conn.execute(f"INSERT INTO {tabela}_fts({tabela}_fts) VALUES('rebuild')")
+    conn.execute(f"INSERT INTO {tabela}_fts({tabela}_fts) VALUES('optimize')")
+    garantir_gatilhos_fts(conn, tabela)
+
+def garantir_gatilhos_fts(conn, tabela):
+    # Gatilhos que refletem no FTS as inserções, exclusões e alterações de
+    # descrição da tabela base (cargas incrementais do etl.py)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {tabela}_fts_ai AFTER INSERT ON {tabela} BEGIN
+            INSERT INTO {tabela}_fts(rowid, product_description) VALUES (new.id, new.product_description);
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {tabela}_fts_ad AFTER DELETE ON {tabela} BEGIN
+            INSERT INTO {tabela}_fts({tabela}_fts, rowid, product_description)
+            VALUES ('delete', old.id, old.product_description);
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {tabela}_fts_au AFTER UPDATE OF product_description ON {tabela}
+        WHEN old.product_description IS NOT new.product_description BEGIN
+            INSERT INTO {tabela}_fts({tabela}_fts, rowid, product_description)
+            VALUES ('delete', old.id, old.product_description);
+            INSERT INTO {tabela}_fts(rowid, product_description) VALUES (new.id, new.product_description);
+        END
+    """)
+
+def criar_mapa_hs6(conn):
+    # Materializa, por prefixo HS6, as estatísticas de AVE das linhas de 8
+    # dígitos dos EUA. A alíquota de um NCM vira uma busca pela chave hs6.
+    # A linha de menor AVE (melhor_codigo) leva junto a alíquota estruturada
+    # (ad valorem, valor específico e unidade) já interpretada pelo ETL.
+    conn.execute("DROP TABLE IF EXISTS hs6_ave")
+    conn.execute("""
+        CREATE TABLE hs6_ave (
+            hs6 TEXT PRIMARY KEY,
+            ave_min REAL,
+            ave_max REAL,
+            ave_mediana REAL,
+            melhor_codigo TEXT,
+            linhas INTEGER NOT NULL,
+            candidatos TEXT NOT NULL,
+            ad_valorem REAL,
+            especifico REAL,
+            unidade TEXT
+        ) WITHOUT ROWID
+    """)
+    grupos = {}
+    taxas = {}
+    for hs6, codigo, ave, ad_valorem, especifico, unidade in conn.execute(
+            "SELECT hs6, product_code, ave, ad_valorem, especifico, unidade FROM hs_codes ORDER BY hs6, product_code"):
+        grupos.setdefault(hs6, []).append((codigo, ave))
+        taxas[codigo] = (ad_valorem, especifico, unidade)
+    linhas = []
+    for hs6, candidatos in grupos.items():
+        com_ave = sorted((ave, codigo) for codigo, ave in candidatos if ave is not None)
+        aves = [ave for ave, _ in com_ave]
+        melhor = com_ave[0][1] if com_ave else candidatos[0][0]
+        linhas.append((
+            hs6,
+            aves[0] if aves else None,
+            aves[-1] if aves else None,
+            statistics.median(aves) if aves else None,
+            melhor,
+            len(candidatos),
+            json.dumps([codigo for codigo, _ in candidatos]),
+        ) + taxas[melhor])
+    conn.executemany("INSERT INTO hs6_ave VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", linhas)
+    return len(linhas)
+
+def finalizar_banco(conn):
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+# -------------------------
+# VERSÃO DOS DADOS E SNAPSHOT ARROW
+# -------------------------
+# Cada carga que altera uma tabela incrementa o PRAGMA user_version do
+# banco. O snapshot Arrow grava essa versão nos metadados; o app só usa o
+# snapshot quando ela bate com a do banco.
+def incrementar_versao(conn):
+    versao = conn.execute("PRAGMA user_version").fetchone()[0] + 1
+    conn.execute(f"PRAGMA user_version={versao}")
+    return versao
+
+def escrever_snapshot(conn, tabela, colunas, caminho):
+    # Arquivo Arrow IPC sem compressão, ordenado por product_code, para ser
+    # mapeado em memória pelo app. Gravado num temporário e trocado de uma
+    # vez: processos com o arquivo antigo mapeado continuam lendo o antigo.
+    if pa is None:
+        return None
+    cursor = conn.execute(f"SELECT {', '.join(colunas)} FROM {tabela} ORDER BY product_code")
+    dados = list(zip(*cursor.fetchall())) or [[] for _ in colunas]
+    versao = conn.execute("PRAGMA user_version").fetchone()[0]
+    arrays = [pa.array(list(valores), type=pa.float64() if coluna == "ave" else pa.string())
+              for coluna, valores in zip(colunas, dados)]
+    snapshot = pa.table(arrays, names=colunas).replace_schema_metadata({"versao_banco": str(versao)})
+    temporario = caminho + ".tmp"
+    with pa.OSFile(temporario, "wb") as arquivo, pa.ipc.new_file(arquivo, snapshot.schema) as escritor:
+        escritor.write_table(snapshot)
+    os.replace(temporario, caminho)
+    return snapshot.num_rows
+
+def converter_numero(valor):
+    # Valores ausentes ou textuais ("N/A") viram NULL em colunas REAL
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        return None
+    return None if pd.isna(numero) else numero
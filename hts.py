@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sqlite3
+import threading
+import time
+import requests
+from bs4 import BeautifulSoup
+from decouple import config
+import cliente_http
+from referencia import BASE_DIR, USA_DB, normalizar_prefixo, conexao_leitura
+
+# -------------------------
+# CONFIGURAÇÃO
+# -------------------------
+# HTS_BASE_URL pode apontar para um servidor local com HTML de exemplo,
+# permitindo testar a consulta sem acesso à internet.
+HTS_BASE_URL = config("HTS_BASE_URL", default="https://hts.usitc.gov")
+HTS_CACHE_DB = config("HTS_CACHE_DB", default=os.path.join(BASE_DIR, "hts_cache.db"))
+# Validade (em segundos) de um código encontrado e de uma busca sem resultado
+HTS_CACHE_TTL = config("HTS_CACHE_TTL", default=7 * 24 * 3600, cast=int)
+HTS_CACHE_TTL_NEGATIVO = config("HTS_CACHE_TTL_NEGATIVO", default=24 * 3600, cast=int)
+
+# -------------------------
+# CACHE PERSISTENTE (SQLite)
+# -------------------------
+# Fica num arquivo próprio ao lado do usa_database.db: gravar no banco de
+# referência invalidaria o cache de tabelas do app a cada consulta.
+_conexoes = threading.local()
+
+def _conexao_cache(db_path):
+    conexoes = getattr(_conexoes, "por_banco", None)
+    if conexoes is None:
+        conexoes = _conexoes.por_banco = {}
+    conn = conexoes.get(db_path)
+    if conn is None:
+        conn = sqlite3.connect(db_path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS hts_cache (
+                hs6 TEXT PRIMARY KEY,
+                codigo TEXT,
+                taxa TEXT,
+                consultado_em REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        conexoes[db_path] = conn
+    return conn
+
+def ler_cache(hs6, db_path=None, agora=None):
+    # Retorna (encontrado, codigo, taxa). Um resultado negativo válido
+    # volta como (True, None, None), evitando nova consulta ao site.
+    conn = _conexao_cache(db_path or HTS_CACHE_DB)
+    linha = conn.execute("SELECT codigo, taxa, consultado_em FROM hts_cache WHERE hs6 = ?", (hs6,)).fetchone()
+    if linha is None:
+        return False, None, None
+    codigo, taxa, consultado_em = linha
+    ttl = HTS_CACHE_TTL if codigo is not None else HTS_CACHE_TTL_NEGATIVO
+    if (agora or time.time()) - consultado_em > ttl:
+        return False, None, None
+    return True, codigo, taxa
+
+def gravar_cache(hs6, codigo, taxa, db_path=None):
+    conn = _conexao_cache(db_path or HTS_CACHE_DB)
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO hts_cache (hs6, codigo, taxa, consultado_em) VALUES (?, ?, ?, ?)",
+                     (hs6, codigo, taxa, time.time()))
+
+def limpar_cache_hts(db_path=None):
+    conn = _conexao_cache(db_path or HTS_CACHE_DB)
+    with conn:
+        conn.execute("DELETE FROM hts_cache")
+
+# -------------------------
+# CONSULTA AO USITC
+# -------------------------
+def consultar_usitc(hs_code_6, base_url=None):
+    # Retorna (encontrado, codigo, taxa); encontrado=False indica falha de
+    # consulta (status diferente de 200), que não deve ir para o cache.
+    url = f"{base_url or HTS_BASE_URL}/search?q={hs_code_6}"
+    headers = {"User-Agent": "Mozilla/5.0"}
+    try:
+        response = cliente_http.get(url, headers=headers)
+    except requests.RequestException:
+        return False, None, None
+    if response.status_code != 200:
+        return False, None, None
+    soup = BeautifulSoup(response.text, "html.parser")
+    for row in soup.find_all("tr", class_=["odd", "even"]):
+        cols = row.find_all("td")
+        if len(cols) > 1:
+            codigo = cols[0].text.strip()
+            taxa = cols[-1].text.strip()
+            # O site exibe o código com pontos (ex.: 6403.99.60.75)
+            if normalizar_prefixo(codigo).startswith(str(hs_code_6)):
+                return True, codigo, taxa
+    return True, None, None
+
+# -------------------------
+# TABELA HTS LOCAL (importar_hts.py)
+# -------------------------
+def formatar_hts(codigo):
+    # 6403996075 -> 6403.99.60.75, como exibido pelo USITC
+    partes = [codigo[:4], codigo[4:6], codigo[6:8], codigo[8:10]]
+    return ".".join(p for p in partes if p)
+
+def buscar_hts_local(hs6, db_path=None):
+    try:
+        linha = conexao_leitura(db_path or USA_DB).execute(
+            "SELECT codigo, taxa_geral FROM hts10 WHERE hs6 = ? AND length(codigo) = 10 ORDER BY codigo LIMIT 1",
+            (hs6,)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        # Tabela hts10 ainda não importada
+        return None
+    return (formatar_hts(linha[0]), linha[1]) if linha else None
+
+def buscar_hs_10_digitos(hs_code_6, usar_cache=True, db_path=None, base_url=None, usar_local=True):
+    hs6 = normalizar_prefixo(hs_code_6)[:6]
+    if usar_local:
+        local = buscar_hts_local(hs6)
+        if local:
+            return local
+    if usar_cache:
+        encontrado, codigo, taxa = ler_cache(hs6, db_path)
+        if encontrado:
+            return codigo, taxa
+    consultado, codigo, taxa = consultar_usitc(hs6, base_url)
+    if consultado and usar_cache:
+        gravar_cache(hs6, codigo, taxa, db_path)
+    return codigo, taxa
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+import csv
+import json
+import sqlite3
+import sys
+from referencia import USA_DB, normalizar_prefixo
+from tarifas import analisar_taxa
+
+# -------------------------
+# IMPORTAÇÃO OFFLINE DA TABELA HTS (USITC)
+# -------------------------
+# Lê o arquivo exportado em https://hts.usitc.gov (CSV ou JSON) e grava a
+# tabela hts10 no usa_database.db, indexada por código e por HS6, com a
+# alíquota geral já decomposta em colunas numéricas.
+# Uso: python importar_hts.py hts_2024.csv [caminho_do_banco]
+
+# Nomes de coluna das exportações CSV e JSON do USITC
+CAMPOS = {
+    "codigo": ("HTS Number", "htsno"),
+    "indent": ("Indent", "indent"),
+    "descricao": ("Description", "description"),
+    "unidade_quantidade": ("Unit of Quantity", "units"),
+    "taxa_geral": ("General Rate of Duty", "general"),
+}
+
+def _campo(registro, nome):
+    for chave in CAMPOS[nome]:
+        if chave in registro:
+            valor = registro[chave]
+            if isinstance(valor, list):
+                valor = ", ".join(str(v) for v in valor)
+            return valor.strip() if isinstance(valor, str) else valor
+    return None
+
+def ler_registros(caminho):
+    if caminho.lower().endswith(".json"):
+        with open(caminho, encoding="utf-8") as arquivo:
+            yield from json.load(arquivo)
+    else:
+        with open(caminho, encoding="utf-8-sig", newline="") as arquivo:
+            yield from csv.DictReader(arquivo)
+
+def linhas_hts(registros):
+    # Linhas estatísticas de 10 dígitos costumam vir sem alíquota: herdam a
+    # da linha de 8 dígitos (ou superior) mais próxima.
+    taxas_por_prefixo = {}
+    for registro in registros:
+        codigo = normalizar_prefixo(_campo(registro, "codigo") or "")
+        if len(codigo) < 6:
+            continue
+        taxa = _campo(registro, "taxa_geral") or None
+        if taxa:
+            taxas_por_prefixo[codigo] = taxa
+        else:
+            for tamanho in (8, 6):
+                taxa = taxas_por_prefixo.get(codigo[:tamanho])
+                if taxa:
+                    break
+        taxa_analisada = analisar_taxa(taxa)
+        indent = _campo(registro, "indent")
+        yield (
+            codigo,
+            codigo[:6],
+            int(indent) if str(indent or "").isdigit() else None,
+            _campo(registro, "descricao"),
+            _campo(registro, "unidade_quantidade") or None,
+            taxa,
+            taxa_analisada["ad_valorem"],
+            taxa_analisada["especifico"],
+            taxa_analisada["unidade"],
+        )
+
+def importar_hts(caminho, db_path=USA_DB):
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS hts10")
+            conn.execute("""
+                CREATE TABLE hts10 (
+                    codigo TEXT PRIMARY KEY,
+                    hs6 TEXT NOT NULL,
+                    indent INTEGER,
+                    descricao TEXT,
+                    unidade_quantidade TEXT,
+                    taxa_geral TEXT,
+                    ad_valorem REAL,
+                    especifico REAL,
+                    unidade_especifica TEXT
+                ) WITHOUT ROWID
+            """)
+            conn.executemany("INSERT OR REPLACE INTO hts10 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             linhas_hts(ler_registros(caminho)))
+            conn.execute("CREATE INDEX idx_hts10_hs6 ON hts10(hs6, codigo)")
+        total = conn.execute("SELECT COUNT(*) FROM hts10").fetchone()[0]
+        conn.execute("ANALYZE hts10")
+    finally:
+        conn.close()
+    return total
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python importar_hts.py <arquivo.csv|arquivo.json> [banco]")
+        sys.exit(1)
+    total = importar_hts(sys.argv[1], *sys.argv[2:3])
+    print(f"📌 Tabela HTS importada com sucesso! ({total} linhas)")
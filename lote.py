@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+import csv
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from comparacao import cotar_d2c, cotar_formal
+from custos import calcular_breakdown_formal, total_itens_nas_caixas
+from referencia import tarifas_por_ncm, componentes_imposto
+from servico import normalizar_ncm, codigo_hs6
+
+# -------------------------
+# COMPARAÇÃO EM LOTE (CATÁLOGO DE SKUs)
+# -------------------------
+# Lê um catálogo CSV ou Parquet, resolve a alíquota de cada NCM, monta as
+# caixas master, cota D2C e Formal com concorrência limitada e grava uma
+# linha de resultado por SKU. O catálogo é processado em blocos, então o
+# uso de memória não cresce com o tamanho do arquivo.
+# Uso: python lote.py catalogo.csv resultados.csv [--concorrencia 8]
+
+# Colunas do catálogo (mesmos nomes de dados_inseridos no app). As que
+# faltarem usam os padrões da linha de comando.
+COLUNAS_OBRIGATORIAS = ["item_altura", "item_largura", "item_profundidade", "item_peso", "item_preco",
+                        "item_quantidade"]
+PADROES = {
+    "master_altura": 40,
+    "master_largura": 40,
+    "master_profundidade": 40,
+    "master_max_peso": 50.0,
+    "armazenagem": 0.50,
+    "frete_local": 5.00,
+}
+CONVERSOES = {
+    "item_altura": float,
+    "item_largura": float,
+    "item_profundidade": float,
+    "item_peso": float,
+    "item_preco": float,
+    "item_quantidade": int,
+    "master_altura": float,
+    "master_largura": float,
+    "master_profundidade": float,
+    "master_max_peso": float,
+    "armazenagem": float,
+    "frete_local": float,
+    "tax_rate": float,
+    "imposto_especifico": float,
+}
+
+COLUNAS_RESULTADO = [
+    "sku", "ncm", "item_quantidade", "tax_rate", "imposto_especifico", "num_caixas", "capacidade_caixa",
+    "d2c_transportadora", "d2c_por_item", "d2c_total",
+    "formal_transportadora", "formal_frete_total", "formal_frete_por_item", "formal_imposto_por_item",
+    "formal_armazenagem_por_item", "formal_frete_local_por_item", "formal_por_item", "formal_total",
+    "economia_formal_total", "melhor_modelo", "erro",
+]
+
+def _ler_csv(caminho):
+    with open(caminho, encoding="utf-8-sig", newline="") as arquivo:
+        yield from csv.DictReader(arquivo)
+
+def _ler_parquet(arquivo_parquet, tamanho_bloco):
+    for lote in arquivo_parquet.iter_batches(batch_size=tamanho_bloco):
+        yield from lote.to_pylist()
+
+def ler_catalogo(caminho, tamanho_bloco=1000):
+    # Iterador de dicionários linha a linha, sem carregar o arquivo inteiro.
+    # O Parquet é aberto já aqui: sem pyarrow (requirements.txt) ou com
+    # arquivo inválido, o erro sai antes de criar o arquivo de resultados.
+    if caminho.lower().endswith((".parquet", ".pq")):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Catálogos Parquet exigem o pacote pyarrow (pip install pyarrow).")
+        return _ler_parquet(pq.ParquetFile(caminho), tamanho_bloco)
+    return _ler_csv(caminho)
+
+def preparar_dados(linha, padroes):
+    dados = dict(padroes)
+    for chave, valor in linha.items():
+        if valor is None or valor == "":
+            continue
+        dados[chave] = CONVERSOES[chave](valor) if chave in CONVERSOES else valor
+    faltando = [c for c in COLUNAS_OBRIGATORIAS if c not in dados]
+    if faltando:
+        raise ValueError(f"Colunas ausentes: {', '.join(faltando)}")
+    if dados.get("ncm"):
+        dados["ncm"] = normalizar_ncm(dados["ncm"])
+    return dados
+
+def _hs6_da_linha(linha):
+    # Chave do HS6 para a consulta em lote; NCM inválido vira erro da linha
+    # em preparar_dados, aqui só fica de fora da consulta
+    try:
+        return codigo_hs6(normalizar_ncm(linha["ncm"])) if linha.get("ncm") else None
+    except ValueError:
+        return None
+
+def comparar_item(dados):
+    resultado = {
+        "sku": dados.get("sku"),
+        "ncm": dados.get("ncm"),
+        "item_quantidade": dados["item_quantidade"],
+        "tax_rate": dados["tax_rate"],
+        "imposto_especifico": dados.get("imposto_especifico", 0.0),
+    }
+    nome_d2c, valor_d2c = cotar_d2c(dados)
+    formal = cotar_formal(dados)
+    resultado["num_caixas"] = formal["num_boxes"]
+    resultado["capacidade_caixa"] = formal["capacity"]
+    erros = []
+    if nome_d2c:
+        resultado["d2c_transportadora"] = nome_d2c
+        resultado["d2c_por_item"] = valor_d2c
+        resultado["d2c_total"] = valor_d2c * dados["item_quantidade"]
+    else:
+        erros.append("cotação D2C")
+    if formal["nome"]:
+        total_items = total_itens_nas_caixas(formal["boxes"], dados["item_preco"])
+        breakdown = calcular_breakdown_formal(formal["valor"], total_items, dados)
+        resultado["formal_transportadora"] = formal["nome"]
+        resultado["formal_frete_total"] = breakdown["Frete Formal Total"]
+        resultado["formal_frete_por_item"] = breakdown["Custo de Frete por Item"]
+        resultado["formal_imposto_por_item"] = breakdown["Imposto por Item"]
+        resultado["formal_armazenagem_por_item"] = breakdown["Custo de Armazenagem por Item"]
+        resultado["formal_frete_local_por_item"] = breakdown["Custo de Frete Local por Item"]
+        resultado["formal_por_item"] = breakdown["Total Formal por Item"]
+        resultado["formal_total"] = breakdown["Total Formal por Item"] * dados["item_quantidade"]
+    else:
+        erros.append("cotação Formal")
+    if not erros:
+        resultado["economia_formal_total"] = resultado["d2c_total"] - resultado["formal_total"]
+        resultado["melhor_modelo"] = "Formal" if resultado["economia_formal_total"] > 0 else "D2C"
+    else:
+        resultado["erro"] = "Falha na " + " e ".join(erros)
+    return resultado
+
+def _processar_linha(linha, padroes, tarifas):
+    try:
+        dados = preparar_dados(linha, padroes)
+        if "tax_rate" not in dados:
+            # Sem tarifa nem tax_rate, o custo Formal sairia sem imposto
+            tarifa = tarifas.get(codigo_hs6(dados.get("ncm")))
+            if tarifa is None:
+                motivo = f"sem tarifa para o HS6 do NCM {dados['ncm']}" if dados.get("ncm") else "sem NCM"
+                raise ValueError(f"Alíquota desconhecida ({motivo}); informe a coluna tax_rate")
+            dados["tax_rate"], dados["imposto_especifico"] = componentes_imposto(tarifa, dados["item_peso"])
+        return comparar_item(dados)
+    except Exception as erro:
+        return {"sku": linha.get("sku"), "ncm": linha.get("ncm"), "erro": str(erro)}
+
+def processar_catalogo(caminho_entrada, caminho_saida, concorrencia=8, tamanho_bloco=256, padroes=None):
+    padroes = dict(PADROES, **(padroes or {}))
+    estatisticas = {"itens": 0, "erros": 0, "formal": 0, "d2c": 0, "segundos": 0.0}
+    inicio = time.perf_counter()
+    linhas = ler_catalogo(caminho_entrada)
+    with open(caminho_saida, "w", encoding="utf-8", newline="") as arquivo, \
+            ThreadPoolExecutor(max_workers=concorrencia, thread_name_prefix="lote") as executor:
+        escritor = csv.DictWriter(arquivo, fieldnames=COLUNAS_RESULTADO, extrasaction="ignore")
+        escritor.writeheader()
+        while True:
+            bloco = list(islice(linhas, tamanho_bloco))
+            if not bloco:
+                break
+            # Alíquotas do bloco inteiro numa única consulta ao SQLite
+            tarifas = tarifas_por_ncm([c for c in map(_hs6_da_linha, bloco) if c])
+            for resultado in executor.map(lambda l: _processar_linha(l, padroes, tarifas), bloco):
+                escritor.writerow(resultado)
+                estatisticas["itens"] += 1
+                if resultado.get("erro"):
+                    estatisticas["erros"] += 1
+                elif resultado["melhor_modelo"] == "Formal":
+                    estatisticas["formal"] += 1
+                else:
+                    estatisticas["d2c"] += 1
+            arquivo.flush()
+    estatisticas["segundos"] = time.perf_counter() - inicio
+    return estatisticas
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Comparação D2C vs. Exportação Formal para um catálogo de SKUs")
+    parser.add_argument("entrada", help="Catálogo CSV ou Parquet")
+    parser.add_argument("saida", help="Arquivo CSV de resultados")
+    parser.add_argument("--concorrencia", type=int, default=8, help="Cotações simultâneas")
+    parser.add_argument("--bloco", type=int, default=256, help="Linhas processadas por bloco")
+    for chave, valor in PADROES.items():
+        parser.add_argument(f"--{chave.replace('_', '-')}", type=float, default=valor)
+    args = parser.parse_args()
+    padroes = {chave: getattr(args, chave) for chave in PADROES}
+    estatisticas = processar_catalogo(args.entrada, args.saida, args.concorrencia, args.bloco, padroes)
+    print(f"📌 {estatisticas['itens']} itens processados em {estatisticas['segundos']:.1f}s "
+          f"(Formal: {estatisticas['formal']}, D2C: {estatisticas['d2c']}, erros: {estatisticas['erros']})")
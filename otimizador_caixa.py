@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+from decouple import config
+from cotacao import calcular_frete_formal
+from embalagem import caixa_master_dos_dados, capacidade_geometrica
+
+# Divisor de peso cubado (cm³/kg) usado pelas transportadoras internacionais
+DIVISOR_CUBAGEM = config("DIVISOR_CUBAGEM", default=5000, cast=int)
+
+# -------------------------
+# ESCOLHA DA CAIXA MASTER
+# -------------------------
+# Avalia um estoque de caixas padrão para um item: para cada caixa calcula
+# capacidade, número de caixas e peso taxável (maior entre o peso real e o
+# cubado) sem chamar a API. Caixas dominadas (outra caixa usa no máximo o
+# mesmo número de caixas, o mesmo peso taxável e o mesmo custo de papelão)
+# são descartadas. Caixas em que o item não cabe (capacidade geométrica 0 ou
+# item mais pesado que o limite da caixa) saem antes da poda: a regra de
+# "um item por caixa" de capacidade_caixa() não vale para escolher estoque.
+# As restantes são cotadas em ordem de peso taxável, e uma
+# candidata deixa de ser cotada quando, pelo limite inferior de frete de
+# uma caixa já cotada que ela não supera, já não pode vencer a melhor.
+# As cotações passam pelo cache, então itens iguais não repetem chamadas.
+#
+# caixas: [{"nome", "altura", "largura", "profundidade", "max_peso", "custo"}]
+# ("custo" é opcional: preço de cada caixa de papelão, em USD)
+
+# Estoque padrão de caixas (pode ser editado na tela da Etapa 3)
+CAIXAS_PADRAO = [
+    {"nome": "P 30x30x30", "altura": 30, "largura": 30, "profundidade": 30, "max_peso": 20.0, "custo": 1.20},
+    {"nome": "M 40x40x40", "altura": 40, "largura": 40, "profundidade": 40, "max_peso": 30.0, "custo": 1.80},
+    {"nome": "G 50x40x40", "altura": 50, "largura": 40, "profundidade": 40, "max_peso": 40.0, "custo": 2.30},
+    {"nome": "GG 60x50x40", "altura": 60, "largura": 50, "profundidade": 40, "max_peso": 50.0, "custo": 2.90},
+]
+
+def caixa_comporta(dados, caixa):
+    geometrica = capacidade_geometrica(dados["item_altura"], dados["item_largura"], dados["item_profundidade"],
+                                       caixa["altura"], caixa["largura"], caixa["profundidade"])
+    return geometrica > 0 and dados["item_peso"] <= caixa["max_peso"]
+
+def avaliar_caixa(dados, caixa, divisor_cubagem=DIVISOR_CUBAGEM):
+    # None se o item não cabe na caixa
+    if not caixa_comporta(dados, caixa):
+        return None
+    dados_caixa = dict(
+        dados,
+        master_altura=caixa["altura"],
+        master_largura=caixa["largura"],
+        master_profundidade=caixa["profundidade"],
+        master_max_peso=caixa["max_peso"],
+    )
+    num_boxes, total_weight, capacity, boxes = caixa_master_dos_dados(dados_caixa)
+    volume = caixa["altura"] * caixa["largura"] * caixa["profundidade"]
+    peso_cubado = num_boxes * volume / divisor_cubagem
+    return {
+        "caixa": caixa["nome"],
+        "capacidade": capacity,
+        "num_caixas": num_boxes,
+        "peso_real": total_weight,
+        "peso_taxavel": max(total_weight, peso_cubado),
+        "custo_caixas": num_boxes * caixa.get("custo", 0.0),
+        "boxes": boxes,
+        "frete": None,
+        "transportadora": None,
+    }
+
+def _domina(a, b):
+    # a domina b: não é pior em nenhum critério e é melhor em ao menos um
+    criterios = ("num_caixas", "peso_taxavel", "custo_caixas")
+    return all(a[c] <= b[c] for c in criterios) and any(a[c] < b[c] for c in criterios)
+
+def podar_dominadas(candidatos):
+    return [c for c in candidatos if not any(_domina(outro, c) for outro in candidatos if outro is not c)]
+
+def otimizar_caixa_master(dados, caixas, cotar=calcular_frete_formal, divisor_cubagem=DIVISOR_CUBAGEM):
+    avaliacoes = [(caixa, avaliar_caixa(dados, caixa, divisor_cubagem)) for caixa in caixas]
+    candidatos = [candidato for _, candidato in avaliacoes if candidato is not None]
+    fronteira = sorted(podar_dominadas(candidatos), key=lambda c: (c["peso_taxavel"], c["num_caixas"]))
+    melhor = None
+    cotadas = []
+    cotacoes = 0
+    for candidato in fronteira:
+        # Frete é não decrescente em peso taxável e número de caixas: uma
+        # cotada que não supera a candidata nos dois é limite inferior
+        limite = max((c["frete"] for c in cotadas
+                      if c["peso_taxavel"] <= candidato["peso_taxavel"] and c["num_caixas"] <= candidato["num_caixas"]),
+                     default=0.0)
+        if melhor is not None and limite + candidato["custo_caixas"] >= melhor["custo_total"]:
+            candidato["podada"] = True
+            continue
+        cotacoes += 1
+        nome, valor = cotar(candidato["boxes"])
+        if valor is None:
+            continue
+        candidato["transportadora"] = nome
+        candidato["frete"] = valor
+        candidato["custo_total"] = valor + candidato["custo_caixas"]
+        cotadas.append(candidato)
+        if melhor is None or candidato["custo_total"] < melhor["custo_total"]:
+            melhor = candidato
+    return {
+        "melhor": melhor,
+        "candidatos": candidatos,
+        "descartadas": [caixa["nome"] for caixa, candidato in avaliacoes if candidato is None],
+        "avaliadas": len(fronteira),
+        "cotacoes": cotacoes,
+    }
+
+def otimizar_catalogo(itens, caixas, cotar=calcular_frete_formal, divisor_cubagem=DIVISOR_CUBAGEM):
+    # Melhor caixa para cada item de uma lista de dados (mesmo formato do app)
+    return [otimizar_caixa_master(dados, caixas, cotar, divisor_cubagem) for dados in itens]
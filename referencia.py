@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import json
+import sqlite3
+import threading
+from datetime import date
+from bisect import bisect_left
+import pandas as pd
+from custos import imposto_especifico_por_item
+
+try:
+    import pyarrow as pa
+except ImportError:  # sem pyarrow, os índices são montados a partir do SQLite
+    pa = None
+
+# Caminhos dos bancos de referência (relativos ao diretório do app)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+NCM_DB = os.path.join(BASE_DIR, "ncm_database.db")
+USA_DB = os.path.join(BASE_DIR, "usa_database.db")
+TARIFAS_DB = os.path.join(BASE_DIR, "tarifas.db")
+
+# Snapshot Arrow gerado pelo etl.py para a busca de NCM por prefixo (a
+# tabela hs_codes dos EUA é consultada só por hs6_ave, direto no SQLite)
+SNAPSHOT_NCM = os.path.join(BASE_DIR, "ncm.arrow")
+COLUNAS_SNAPSHOT = {
+    "ncm": ["product_code", "product_description"],
+}
+
+# Parceiro das tarifas NMF (aplicadas a todos os parceiros), como no WITS
+PARCEIRO_NMF = "WLD"
+# País exportador: a tabela dele na loja é tarifa de importação do Brasil,
+# não de um mercado de destino
+PAIS_ORIGEM = "BRA"
+
+# -------------------------
+# CACHE DE DADOS DE REFERÊNCIA
+# -------------------------
+# Snapshots e índices são montados uma única vez por processo e
+# compartilhados entre todas as sessões do Streamlit. Quando o arquivo muda
+# em disco (novo ETL), são recarregados.
+_cache = {}
+_lock = threading.RLock()
+
+def _assinatura_arquivo(db_path):
+    # Em modo WAL as gravações recentes ficam no arquivo -wal até o checkpoint
+    assinatura = []
+    for caminho in (db_path, db_path + "-wal"):
+        try:
+            info = os.stat(caminho)
+        except FileNotFoundError:
+            assinatura.append(None)
+            continue
+        assinatura.append((info.st_mtime_ns, info.st_size))
+    return tuple(assinatura) if assinatura[0] is not None else None
+
+def _abrir_leitura(db_path, check_same_thread=True):
+    return sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=check_same_thread)
+
+def _obter(chave, db_path, construir):
+    assinatura = _assinatura_arquivo(db_path)
+    entrada = _cache.get(chave)
+    if entrada is not None and entrada["assinatura"] == assinatura:
+        return entrada["valor"]
+    with _lock:
+        # Outra sessão pode ter recarregado enquanto aguardávamos o lock
+        entrada = _cache.get(chave)
+        if entrada is not None and entrada["assinatura"] == assinatura:
+            return entrada["valor"]
+        valor = construir()
+        _cache[chave] = {"assinatura": assinatura, "valor": valor}
+        return valor
+
+# -------------------------
+# CÓDIGOS NCM/HS
+# -------------------------
+LARGURA_CODIGO = 8
+LIMITE_SUGESTOES = 50
+
+def normalizar_codigo(codigo, largura=LARGURA_CODIGO):
+    # O ETL antigo gravava product_code como INTEGER, perdendo o zero à
+    # esquerda dos capítulos 01-09 (ex.: 7082010 -> 07082010).
+    if isinstance(codigo, float):
+        codigo = int(codigo)
+    digitos = "".join(c for c in str(codigo) if c.isdigit())
+    return digitos.zfill(largura)
+
+def normalizar_prefixo(prefixo):
+    # Aceita entradas digitadas com pontos, como "6403.99"
+    return "".join(c for c in str(prefixo) if c.isdigit())
+
+# -------------------------
+# SNAPSHOTS ARROW MAPEADOS EM MEMÓRIA
+# -------------------------
+# O arquivo .arrow é mapeado (mmap) e lido sem cópia: abrir é quase
+# instantâneo e as páginas ficam no cache do sistema operacional,
+# compartilhadas por todos os processos do servidor. O índice de prefixos
+# faz a busca binária direto na coluna Arrow, sem montar listas Python.
+# Se o snapshot faltar ou for de outra versão do banco, usa o SQLite.
+class _ColunaArrow:
+    # Sequência indexável sobre uma coluna Arrow (para o bisect)
+    def __init__(self, coluna):
+        self.coluna = coluna.combine_chunks() if isinstance(coluna, pa.ChunkedArray) else coluna
+
+    def __len__(self):
+        return len(self.coluna)
+
+    def __getitem__(self, i):
+        return self.coluna[i].as_py()
+
+class IndiceArrow:
+    # Códigos ordenados pelo ETL (texto com zeros à esquerda): "todos os
+    # códigos que começam com X" vira um intervalo contíguo encontrado com
+    # duas buscas binárias
+    def __init__(self, tabela, coluna_codigo="product_code"):
+        self.tabela = tabela
+        self.codigos = _ColunaArrow(tabela.column(coluna_codigo))
+        self.colunas = [coluna_codigo] + [c for c in tabela.column_names if c != coluna_codigo]
+
+    def __len__(self):
+        return len(self.codigos)
+
+    def intervalo(self, prefixo):
+        prefixo = normalizar_prefixo(prefixo)
+        inicio = bisect_left(self.codigos, prefixo)
+        # "\uffff" é maior que qualquer dígito: fecha o intervalo do prefixo
+        fim = bisect_left(self.codigos, prefixo + "\uffff", inicio)
+        return inicio, fim
+
+    def buscar(self, prefixo, limite=LIMITE_SUGESTOES):
+        inicio, fim = self.intervalo(prefixo)
+        if limite is not None:
+            fim = min(fim, inicio + limite)
+        fatia = self.tabela.slice(inicio, fim - inicio).select(self.colunas).to_pydict()
+        return [list(linha) for linha in zip(*fatia.values())]
+
+def _abrir_snapshot(caminho):
+    if not os.path.exists(caminho):
+        return None
+    return pa.ipc.open_file(pa.memory_map(caminho, "r")).read_all()
+
+def versao_banco(db_path):
+    try:
+        return conexao_leitura(db_path).execute("PRAGMA user_version").fetchone()[0]
+    except sqlite3.OperationalError:
+        return None
+
+def carregar_snapshot(caminho, db_path):
+    if pa is None:
+        return None
+    tabela = _obter(("snapshot", caminho), caminho, lambda: _abrir_snapshot(caminho))
+    if tabela is None or (tabela.schema.metadata or {}).get(b"versao_banco") != str(versao_banco(db_path)).encode():
+        return None
+    return tabela
+
+def carregar_indice_ncm():
+    # None sem snapshot válido; a busca então usa a faixa no SQLite
+    if carregar_snapshot(SNAPSHOT_NCM, NCM_DB) is None:
+        return None
+    return _obter(("indice", SNAPSHOT_NCM), SNAPSHOT_NCM, lambda: IndiceArrow(carregar_snapshot(SNAPSHOT_NCM, NCM_DB)))
+
+# -------------------------
+# CONSULTAS DIRETO NO DISCO
+# -------------------------
+# Com product_code TEXT indexado, "começa com X" vira uma faixa
+# product_code >= X AND product_code < X + "\uffff" atendida pelo índice,
+# sem carregar a tabela inteira. Uma conexão somente leitura por thread.
+_conexoes = threading.local()
+
+def conexao_leitura(db_path):
+    conexoes = getattr(_conexoes, "por_banco", None)
+    if conexoes is None:
+        conexoes = _conexoes.por_banco = {}
+    conn = conexoes.get(db_path)
+    if conn is None:
+        conn = conexoes[db_path] = _abrir_leitura(db_path)
+    return conn
+
+def buscar_prefixo_sql(db_path, tabela, colunas, prefixo, limite=LIMITE_SUGESTOES):
+    prefixo = normalizar_prefixo(prefixo)
+    query = (f"SELECT product_code, {', '.join(colunas)} FROM {tabela} "
+             "WHERE product_code >= ? AND product_code < ? ORDER BY product_code")
+    parametros = [prefixo, prefixo + "\uffff"]
+    if limite is not None:
+        query += " LIMIT ?"
+        parametros.append(limite)
+    return [list(linha) for linha in conexao_leitura(db_path).execute(query, parametros)]
+
+def buscar_ncm_sql(prefixo, limite=LIMITE_SUGESTOES):
+    return buscar_prefixo_sql(NCM_DB, "ncm", ["product_description"], prefixo, limite)
+
+def buscar_ncm_prefixo(prefixo, limite=LIMITE_SUGESTOES):
+    # Com o snapshot Arrow válido, busca binária na coluna mapeada; sem ele
+    # (pyarrow ausente, ETL ainda não rodou), a faixa no índice do SQLite
+    # atende sem carregar a tabela inteira na memória
+    indice = carregar_indice_ncm()
+    if indice is not None:
+        return indice.buscar(prefixo, limite)
+    return buscar_ncm_sql(prefixo, limite)
+
+# -------------------------
+# BUSCA TEXTUAL NAS DESCRIÇÕES (FTS5)
+# -------------------------
+def _radical(palavra):
+    # Plural simples: "calçados" -> "calçado"*, que casa singular e plural
+    if len(palavra) > 3 and palavra.lower().endswith("s"):
+        return palavra[:-1]
+    return palavra
+
+def montar_consulta_fts(texto):
+    # Cada palavra vira um termo de prefixo entre aspas ("couro"*), o que
+    # também neutraliza a sintaxe do FTS5 digitada pelo usuário. Palavras
+    # curtas ("de", "e") são descartadas: casariam com quase tudo.
+    palavras = re.findall(r"\w+", str(texto))
+    longas = [p for p in palavras if len(p) > 2]
+    return " ".join(f'"{_radical(p)}"*' for p in (longas or palavras))
+
+def buscar_descricao_sql(db_path, tabela, colunas, texto, limite=LIMITE_SUGESTOES):
+    consulta = montar_consulta_fts(texto)
+    if not consulta:
+        return []
+    selecao = ", ".join(f"t.{c}" for c in ["product_code"] + colunas)
+    query = (f"SELECT {selecao} FROM {tabela}_fts "
+             f"JOIN {tabela} t ON t.id = {tabela}_fts.rowid "
+             f"WHERE {tabela}_fts MATCH ? ORDER BY {tabela}_fts.rank LIMIT ?")
+    return [list(linha) for linha in conexao_leitura(db_path).execute(query, (consulta, limite))]
+
+def buscar_ncm_descricao(texto, limite=LIMITE_SUGESTOES):
+    return buscar_descricao_sql(NCM_DB, "ncm", ["product_description"], texto, limite)
+
+# -------------------------
+# ALÍQUOTA DOS EUA POR HS6 (TABELA hs6_ave)
+# -------------------------
+COLUNAS_TARIFA = ["hs6", "ave_min", "ave_max", "ave_mediana", "melhor_codigo", "linhas", "candidatos",
+                  "ad_valorem", "especifico", "unidade"]
+
+def _linha_tarifa(linha):
+    tarifa = dict(zip(COLUNAS_TARIFA, linha))
+    tarifa["candidatos"] = json.loads(tarifa["candidatos"])
+    return tarifa
+
+def tarifa_hs6(codigo):
+    hs6 = normalizar_codigo(codigo)[:6]
+    linha = conexao_leitura(USA_DB).execute(
+        f"SELECT {', '.join(COLUNAS_TARIFA)} FROM hs6_ave WHERE hs6 = ?", (hs6,)
+    ).fetchone()
+    return _linha_tarifa(linha) if linha else None
+
+def tarifas_por_ncm(codigos):
+    # Junção em lote: a lista inteira vai como um único array JSON e o
+    # SQLite cruza cada NCM com hs6_ave pela chave primária.
+    codigos = [normalizar_codigo(c) for c in codigos]
+    query = (f"SELECT j.value, {', '.join('m.' + c for c in COLUNAS_TARIFA)} FROM json_each(?) j "
+             "JOIN hs6_ave m ON m.hs6 = substr(j.value, 1, 6)")
+    return {linha[0]: _linha_tarifa(linha[1:])
+            for linha in conexao_leitura(USA_DB).execute(query, (json.dumps(codigos),))}
+
+def aliquota_importacao(tarifa):
+    # Menor AVE entre as linhas candidatas; sem AVE conhecido, 0.0
+    if tarifa is None or tarifa["ave_min"] is None:
+        return 0.0
+    return tarifa["ave_min"]
+
+def componentes_imposto(tarifa, item_peso):
+    # (tax_rate, imposto_especifico em USD por item) pela alíquota estruturada
+    # da linha de menor AVE. Sem alíquota estruturada, ou com valor específico
+    # numa unidade que não deriva do peso nem da contagem, usa o AVE.
+    if tarifa is None:
+        return 0.0, 0.0
+    if tarifa["ad_valorem"] is None and tarifa["especifico"] is None:
+        return aliquota_importacao(tarifa), 0.0
+    especifico = imposto_especifico_por_item(tarifa["especifico"], tarifa["unidade"], item_peso)
+    if especifico is None:
+        return aliquota_importacao(tarifa), 0.0
+    return tarifa["ad_valorem"] or 0.0, float(especifico)
+
+# -------------------------
+# LOJA DE TARIFAS MULTIPAÍS (tarifas.db)
+# -------------------------
+# Consultas "vigente em uma data": primeiro a versão mais recente do país
+# com início de vigência até a data, depois as linhas dessa versão pela
+# chave (versao_id, product_code) ou pelo índice (versao_id, hs6).
+# Sem a loja (tarifas.db ainda não gerado pelo etl.py), retornam vazio.
+COLUNAS_VERSAO = ["id", "reporter", "partner", "year", "revision", "valid_from"]
+COLUNAS_LINHA_TARIFA = ["product_code", "hs6", "product_description", "nav_duty", "ave"]
+
+def _data_iso(data):
+    if data is None:
+        data = date.today()
+    return data if isinstance(data, str) else data.isoformat()
+
+def versao_vigente(reporter, data=None, partner=PARCEIRO_NMF, db_path=TARIFAS_DB):
+    try:
+        linha = conexao_leitura(db_path).execute(
+            f"SELECT {', '.join(COLUNAS_VERSAO)} FROM tarifa_versao "
+            "WHERE reporter = ? AND partner = ? AND valid_from <= ? "
+            "ORDER BY valid_from DESC, year DESC, revision DESC LIMIT 1",
+            (reporter, partner, _data_iso(data))
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return dict(zip(COLUNAS_VERSAO, linha)) if linha else None
+
+def destinos_disponiveis(partner=PARCEIRO_NMF, db_path=TARIFAS_DB):
+    try:
+        return [linha[0] for linha in conexao_leitura(db_path).execute(
+            "SELECT DISTINCT reporter FROM tarifa_versao WHERE partner = ? ORDER BY reporter", (partner,))]
+    except sqlite3.OperationalError:
+        return []
+
+def tarifa_vigente(codigo, reporter, data=None, partner=PARCEIRO_NMF, db_path=TARIFAS_DB):
+    versao = versao_vigente(reporter, data, partner, db_path)
+    if versao is None:
+        return None
+    linha = conexao_leitura(db_path).execute(
+        f"SELECT {', '.join(COLUNAS_LINHA_TARIFA)} FROM tarifa WHERE versao_id = ? AND product_code = ?",
+        (versao["id"], normalizar_codigo(codigo))
+    ).fetchone()
+    return dict(versao, **dict(zip(COLUNAS_LINHA_TARIFA, linha))) if linha else None
+
+def tarifas_vigentes_hs6(codigo, reporter, data=None, partner=PARCEIRO_NMF, db_path=TARIFAS_DB):
+    # Linhas nacionais do destino que começam pelo HS6 do código informado
+    versao = versao_vigente(reporter, data, partner, db_path)
+    if versao is None:
+        return []
+    linhas = conexao_leitura(db_path).execute(
+        f"SELECT {', '.join(COLUNAS_LINHA_TARIFA)} FROM tarifa WHERE versao_id = ? AND hs6 = ? ORDER BY product_code",
+        (versao["id"], normalizar_codigo(codigo)[:6])
+    )
+    return [dict(versao, **dict(zip(COLUNAS_LINHA_TARIFA, linha))) for linha in linhas]
+
+def comparar_destinos(codigo, destinos=None, data=None, partner=PARCEIRO_NMF, db_path=TARIFAS_DB,
+                      origem=PAIS_ORIGEM):
+    # Resumo do AVE do HS6 em cada mercado de destino, na data informada
+    # (o país de origem fica de fora)
+    resumo = []
+    for destino in destinos or destinos_disponiveis(partner, db_path):
+        if destino == origem:
+            continue
+        linhas = tarifas_vigentes_hs6(codigo, destino, data, partner, db_path)
+        if not linhas:
+            continue
+        com_ave = sorted((linha["ave"], linha["product_code"]) for linha in linhas if linha["ave"] is not None)
+        resumo.append({
+            "destino": destino,
+            "ano": linhas[0]["year"],
+            "revisao": linhas[0]["revision"],
+            "linhas": len(linhas),
+            "ave_min": com_ave[0][0] if com_ave else None,
+            "ave_max": com_ave[-1][0] if com_ave else None,
+            "melhor_codigo": com_ave[0][1] if com_ave else linhas[0]["product_code"],
+        })
+    return pd.DataFrame(resumo, columns=["destino", "ano", "revisao", "linhas", "ave_min", "ave_max", "melhor_codigo"])
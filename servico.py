@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+from comparacao import cotar_d2c, cotar_formal
+from custos import ROTULOS_BREAKDOWN, calcular_breakdown_formal, total_itens_nas_caixas
+from embalagem import caixa_master_dos_dados
+from referencia import (LIMITE_SUGESTOES, LARGURA_CODIGO, buscar_ncm_prefixo, buscar_ncm_descricao,
+                        normalizar_codigo, normalizar_prefixo, tarifa_hs6, componentes_imposto)
+
+# -------------------------
+# NÚCLEO COMPARTILHADO (APP STREAMLIT E API HTTP)
+# -------------------------
+# Funções sem estado de sessão que recebem e devolvem estruturas simples
+# (dicionários, listas e números), prontas para virar JSON. O app.py e a
+# api.py chamam as mesmas funções, então os caches do processo (índices de
+# NCM, cotações, capacidade das caixas) atendem os dois.
+
+# Valores usados quando a entrada não informa o campo (os mesmos do app)
+PADROES_DADOS = {
+    "item_altura": 10,
+    "item_largura": 10,
+    "item_profundidade": 10,
+    "item_peso": 0.5,
+    "item_preco": 50.0,
+    "item_quantidade": 1,
+    "master_altura": 40,
+    "master_largura": 40,
+    "master_profundidade": 40,
+    "master_max_peso": 50.0,
+    "armazenagem": 0.50,
+    "frete_local": 5.00,
+}
+
+MINIMO_PREFIXO = 4
+MINIMO_DESCRICAO = 3
+DIGITOS_HS6 = 6
+
+def normalizar_ncm(ncm):
+    # Código de 4 a 8 dígitos (pontos, espaços e hífens são aceitos). Com 7
+    # dígitos é um NCM que perdeu o zero à esquerda; códigos curtos (posição,
+    # subposição) ficam como estão. Levanta ValueError se não for um NCM.
+    if isinstance(ncm, float):
+        ncm = int(ncm)
+    texto = str(ncm).strip()
+    digitos = normalizar_prefixo(texto)
+    if any(c not in "0123456789. -" for c in texto) or not MINIMO_PREFIXO <= len(digitos) <= LARGURA_CODIGO:
+        raise ValueError(f"NCM inválido: {texto!r} (informe de {MINIMO_PREFIXO} a {LARGURA_CODIGO} dígitos).")
+    return normalizar_codigo(digitos) if len(digitos) > DIGITOS_HS6 else digitos
+
+def codigo_hs6(ncm):
+    # HS6 do NCM já normalizado, completo com zeros à direita no formato de
+    # 8 dígitos (normalizar_codigo completaria um código curto à esquerda);
+    # None se o código não chega ao HS6
+    if not ncm or len(ncm) < DIGITOS_HS6:
+        return None
+    return ncm[:DIGITOS_HS6].ljust(LARGURA_CODIGO, "0")
+
+def tarifa_ncm(ncm):
+    # Tarifa do HS6 do NCM já normalizado; None se o código não chega ao HS6
+    # ou se o HS6 não tem tarifa
+    codigo = codigo_hs6(ncm)
+    return tarifa_hs6(codigo) if codigo else None
+
+def buscar_ncm(prefixo="", descricao="", limite=LIMITE_SUGESTOES):
+    # [[codigo, descricao], ...] pelo prefixo do código ou pela descrição;
+    # None se nenhum dos critérios tiver o tamanho mínimo (no prefixo, só os
+    # dígitos contam: "abcd" ou "...." não viram uma busca vazia)
+    prefixo = normalizar_prefixo(prefixo or "")
+    descricao = (descricao or "").strip()
+    if len(prefixo) >= MINIMO_PREFIXO:
+        return buscar_ncm_prefixo(prefixo, limite)
+    if len(descricao) >= MINIMO_DESCRICAO:
+        return buscar_ncm_descricao(descricao, limite)
+    return None
+
+def resolver_tarifa(ncm, item_peso=None):
+    # Tarifa dos EUA para o HS6 do NCM; com o peso do item, também as
+    # parcelas ad valorem e específica usadas no custo
+    ncm = normalizar_ncm(ncm)
+    tarifa = tarifa_ncm(ncm)
+    if tarifa is None:
+        return None
+    resultado = dict(tarifa, ncm=ncm)
+    if item_peso is not None:
+        resultado["tax_rate"], resultado["imposto_especifico"] = componentes_imposto(tarifa, item_peso)
+    return resultado
+
+def montar_dados(entrada, tarifa=None):
+    # Dados no formato de dados_inseridos. Sem tax_rate na entrada, a
+    # alíquota vem da tarifa informada ou da tarifa do NCM.
+    dados = dict(PADROES_DADOS)
+    dados.update({chave: valor for chave, valor in entrada.items() if valor is not None})
+    if dados.get("ncm"):
+        dados["ncm"] = normalizar_ncm(dados["ncm"])
+    if "tax_rate" not in dados:
+        if tarifa is None:
+            tarifa = tarifa_ncm(dados.get("ncm"))
+        dados["tax_rate"], dados["imposto_especifico"] = componentes_imposto(tarifa, dados["item_peso"])
+    dados.setdefault("imposto_especifico", 0.0)
+    return dados
+
+# -------------------------
+# RESULTADOS SERIALIZÁVEIS
+# -------------------------
+def descrever_caixas(num_boxes, total_weight, capacity, boxes):
+    return {
+        "num_caixas": num_boxes,
+        "peso_total": total_weight,
+        "capacidade": capacity,
+        "total_itens": boxes.total_itens,
+        "dimensoes": [boxes.altura, boxes.largura, boxes.profundidade],
+        "grupos": [{"caixas": quantidade, "itens_por_caixa": itens} for quantidade, itens in boxes.grupos()],
+    }
+
+def empacotar(dados):
+    return descrever_caixas(*caixa_master_dos_dados(dados))
+
+def resultado_d2c(cotacao):
+    nome, valor = cotacao or (None, None)
+    return {"transportadora": nome, "frete_por_item": valor}
+
+def resultado_formal(formal, dados):
+    resultado = {
+        "caixas": descrever_caixas(formal["num_boxes"], formal["total_weight"], formal["capacity"], formal["boxes"]),
+        "transportadora": formal["nome"],
+        "frete_total": formal["valor"],
+    }
+    if formal["nome"]:
+        breakdown = formal.get("breakdown") or calcular_breakdown_formal(
+            formal["valor"], total_itens_nas_caixas(formal["boxes"], dados["item_preco"]), dados)
+        resultado["memoria_calculo"] = {chave: breakdown[rotulo] for chave, rotulo in ROTULOS_BREAKDOWN.items()}
+        resultado["custo_por_item"] = breakdown[ROTULOS_BREAKDOWN["formal_por_item"]]
+    return resultado
+
+def comparar_d2c(dados):
+    return resultado_d2c(cotar_d2c(dados))
+
+def comparar_formal(dados):
+    return resultado_formal(cotar_formal(dados), dados)
+
+def resumir_comparacao(resultado, dados):
+    # resultado: saída de comparacao.aguardar_comparacao()
+    d2c = resultado_d2c(resultado.get("d2c"))
+    formal = resultado_formal(resultado["formal"], dados) if resultado.get("formal") else None
+    hts10 = resultado.get("hts10") or (None, None)
+    resumo = {
+        "dados": dados,
+        "d2c": d2c,
+        "formal": formal,
+        "hts10": {"codigo": hts10[0], "taxa_geral": hts10[1]},
+        "melhor_modelo": None,
+    }
+    if d2c["frete_por_item"] is not None and formal and formal.get("custo_por_item") is not None:
+        resumo["melhor_modelo"] = "Formal" if formal["custo_por_item"] < d2c["frete_por_item"] else "D2C"
+    return resumo
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+import re
+
+# -------------------------
+# INTERPRETAÇÃO DE ALÍQUOTAS
+# -------------------------
+# Converte textos de alíquota como "Free", "6.5%", "2.3¢/kg",
+# "30 cents each + 4.3%" ou "$1.35/kg + 5%" em colunas numéricas:
+#   ad_valorem  -> fração do valor (0.043 para 4.3%)
+#   especifico  -> valor em USD por unidade
+#   unidade     -> unidade do valor específico ("kg", "un", "l", ...)
+# Campos sem componente correspondente ficam None.
+_PERCENTUAL = re.compile(r"([\d.]+)\s*%")
+_CENTAVOS = re.compile(r"([\d.]+)\s*(?:¢|cents?)\s*(?:/|per|each)?\s*([a-zA-Z][a-zA-Z0-9]*(?:\s+kg)?)?")
+_DOLARES = re.compile(r"\$\s*([\d.]+)\s*(?:/|per|each)?\s*([a-zA-Z][a-zA-Z0-9]*(?:\s+kg)?)?")
+
+_UNIDADES = {
+    "": "un",
+    "each": "un",
+    "no": "un",
+    "pcs": "un",
+    "head": "un",
+    "kg": "kg",
+    "clean kg": "kg",
+    "t": "t",
+    "g": "g",
+    "l": "l",
+    "liter": "l",
+    "litre": "l",
+    "doz": "dz",
+    "dozen": "dz",
+    "pr": "par",
+    "pair": "par",
+    "pairs": "par",
+    "gross": "gross",
+    "thousand": "mil",
+}
+
+def _unidade(texto):
+    texto = " ".join((texto or "").lower().split())
+    return _UNIDADES.get(texto, texto)
+
+def analisar_taxa(texto):
+    resultado = {"ad_valorem": None, "especifico": None, "unidade": None}
+    if texto is None:
+        return resultado
+    texto = str(texto).strip()
+    if not texto or texto.upper() == "N/A":
+        return resultado
+    if texto.lower().startswith("free"):
+        resultado["ad_valorem"] = 0.0
+        return resultado
+    for parte in texto.split("+"):
+        parte = parte.strip()
+        centavos = _CENTAVOS.search(parte)
+        dolares = _DOLARES.search(parte)
+        percentual = _PERCENTUAL.search(parte)
+        if resultado["especifico"] is None and (centavos or dolares):
+            if centavos:
+                valor, unidade = float(centavos.group(1)) / 100, centavos.group(2)
+            else:
+                valor, unidade = float(dolares.group(1)), dolares.group(2)
+            if "each" in parte.lower():
+                unidade = "each"
+            resultado["especifico"] = valor
+            resultado["unidade"] = _unidade(unidade)
+        elif percentual and resultado["ad_valorem"] is None:
+            resultado["ad_valorem"] = float(percentual.group(1)) / 100
+    return resultado
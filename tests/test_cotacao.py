@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cotacao import dividir_em_blocos, somar_por_transportadora
+from embalagem import calcular_caixa_master
+
+def _transportadoras(**valores):
+    return [{"name": nome, "currency_payment_amount": str(valor)} for nome, valor in valores.items()]
+
+def test_somar_pondera_pelas_repeticoes():
+    cotacoes = [_transportadoras(A=100, B=120), _transportadoras(A=30, B=20)]
+    totais = {t["name"]: t["currency_payment_amount"] for t in somar_por_transportadora(cotacoes, [3, 1])}
+    assert totais == {"A": pytest.approx(330), "B": pytest.approx(380)}
+
+def test_somar_so_transportadoras_em_todos_os_blocos():
+    cotacoes = [_transportadoras(A=10, B=12, C=9), _transportadoras(A=10, C=11)]
+    totais = {t["name"] for t in somar_por_transportadora(cotacoes, [1, 1])}
+    assert totais == {"A", "C"}
+
+@pytest.mark.parametrize("cotacoes", [
+    [_transportadoras(A=10), None],
+    [_transportadoras(A=10), []],
+    [_transportadoras(A=10), _transportadoras(B=10)],
+])
+def test_somar_sem_cotacao_completa(cotacoes):
+    assert somar_por_transportadora(cotacoes, [1, 1]) is None
+
+def _lote(quantidade):
+    # Item 10x10x10 cm em caixa 40x40x40: 64 itens por caixa
+    _, _, _, boxes = calcular_caixa_master(10, 10, 10, 0.5, quantidade, 5.0, 40, 40, 40, 50.0)
+    return boxes
+
+@pytest.mark.parametrize("quantidade, tamanho_bloco", [(64 * 250, 100), (64 * 250 + 7, 100), (64 * 30 + 1, 100),
+                                                       (64 * 7, 3), (64 * 7 + 1, 3)])
+def test_blocos_cobrem_todas_as_caixas(quantidade, tamanho_bloco):
+    boxes = _lote(quantidade)
+    blocos = dividir_em_blocos(boxes, tamanho_bloco)
+    assert sum(len(bloco) * repeticoes for bloco, repeticoes in blocos) == len(boxes)
+    itens = sum(round(caixa["weight"] / 0.5) * repeticoes for bloco, repeticoes in blocos for caixa in bloco)
+    assert itens == quantidade
+    assert all(len(bloco) <= tamanho_bloco for bloco, _ in blocos)
+    # No máximo três blocos distintos: cheio, o que contém o restante e o final
+    assert len(blocos) <= 3
+
+def test_blocos_iguais_ao_caminho_por_lista():
+    boxes = _lote(64 * 7 + 1)
+    por_lote = dividir_em_blocos(boxes, 3)
+    por_lista = dividir_em_blocos(list(boxes), 3)
+    assert sorted(repeticoes for _, repeticoes in por_lote) == sorted(repeticoes for _, repeticoes in por_lista)
+    assert sum(len(bloco) * r for bloco, r in por_lote) == sum(len(bloco) * r for bloco, r in por_lista)
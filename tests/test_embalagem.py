@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+from itertools import permutations
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embalagem import capacidade_caixa, capacidade_geometrica
+
+@pytest.mark.parametrize("item, caixa, esperado", [
+    ((10, 10, 10), (40, 40, 40), 64),
+    ((20, 20, 20), (40, 40, 40), 8),
+    ((30, 20, 10), (60, 40, 20), 8),
+    ((50, 10, 10), (40, 40, 40), 0),
+    ((0.3, 0.3, 0.3), (0.9, 0.9, 0.9), 27),
+    # O item em decimais é arredondado para cima na grade, nunca para baixo
+    ((20.04, 20.04, 20.04), (40, 40, 40), 1),
+    ((8.204, 10, 10), (41, 10, 10), 4),
+])
+def test_capacidade_geometrica(item, caixa, esperado):
+    assert capacidade_geometrica(*item, *caixa) == esperado
+
+def test_capacidade_nao_depende_da_orientacao():
+    item = (12, 7, 5)
+    capacidades = {capacidade_geometrica(*rotacao, 40, 30, 25) for rotacao in permutations(item)}
+    assert len(capacidades) == 1
+
+def test_capacidade_nao_passa_do_volume():
+    for item in [(7, 6, 5), (9, 9, 4), (11, 3, 3), (13.5, 6.2, 4.1)]:
+        volume_item = item[0] * item[1] * item[2]
+        assert capacidade_geometrica(*item, 40, 30, 25) <= (40 * 30 * 25) // volume_item
+
+def test_capacidade_caixa_limitada_pelo_peso():
+    assert capacidade_caixa(10, 10, 10, 2.0, 40, 40, 40, 50.0) == 25
+    # Item que não cabe segue sozinho em uma caixa
+    assert capacidade_caixa(50, 10, 10, 1.0, 40, 40, 40, 50.0) == 1
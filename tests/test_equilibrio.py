@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+import math
+import os
+import random
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from custos import LIMITE_DE_MINIMIS, calcular_custos_formal_vetorizado
+from embalagem import caixa_master_dos_dados
+from equilibrio import preco_equilibrio, quantidade_equilibrio
+
+# -------------------------
+# TARIFAS SINTÉTICAS (SEM API)
+# -------------------------
+# Frete = taxa por caixa + valor por kg, com o mesmo formato de
+# calcular_frete_formal (nome, valor). As respostas dos algoritmos são
+# comparadas com a força bruta, quantidade a quantidade ou preço a preço.
+def _dados(item_preco, tax_rate, imposto_especifico=0.0, item_quantidade=1):
+    return {
+        "item_altura": 10, "item_largura": 10, "item_profundidade": 10, "item_peso": 0.5,
+        "item_preco": item_preco, "item_quantidade": item_quantidade,
+        "master_altura": 30, "master_largura": 30, "master_profundidade": 20, "master_max_peso": 50.0,
+        "armazenagem": 0.5, "frete_local": 1.0, "tax_rate": tax_rate, "imposto_especifico": imposto_especifico,
+    }
+
+def _tarifa(por_caixa, por_kg):
+    return lambda boxes: ("X", por_caixa * len(boxes) + por_kg * boxes.peso_total)
+
+def _custo_formal(dados, quantidade, cotar):
+    dados = dict(dados, item_quantidade=quantidade)
+    _, _, _, boxes = caixa_master_dos_dados(dados)
+    custos = calcular_custos_formal_vetorizado(dados["item_preco"], quantidade, dados["tax_rate"], cotar(boxes)[1],
+                                               dados["armazenagem"], dados["frete_local"],
+                                               imposto_especifico=dados["imposto_especifico"])
+    return float(custos["formal_por_item"])
+
+def _primeira_quantidade(dados, cotar, frete_d2c, quantidades):
+    return next((q for q in quantidades if _custo_formal(dados, q, cotar) <= frete_d2c), None)
+
+def _casos_aleatorios(quantidade, semente):
+    sorteio = random.Random(semente)
+    return [(sorteio.uniform(5, 200), sorteio.uniform(0, 0.4), sorteio.uniform(5, 40),
+             sorteio.uniform(10, 80), sorteio.uniform(0.5, 5)) for _ in range(quantidade)]
+
+@pytest.mark.parametrize("preco, tax_rate, frete_d2c, por_caixa, por_kg", _casos_aleatorios(40, 1))
+def test_quantidade_equilibrio_igual_a_forca_bruta(preco, tax_rate, frete_d2c, por_caixa, por_kg):
+    dados = _dados(preco, tax_rate)
+    cotar = _tarifa(por_caixa, por_kg)
+    resultado = quantidade_equilibrio(dados, 300, cotar=cotar, frete_d2c=frete_d2c)
+    assert resultado["quantidade_equilibrio"] == _primeira_quantidade(dados, cotar, frete_d2c, range(1, 301))
+    tributada = resultado["quantidade_tributada"]
+    assert resultado["equilibrio_com_imposto"] == _primeira_quantidade(dados, cotar, frete_d2c, range(tributada, 301))
+
+def test_formal_vence_so_abaixo_do_de_minimis():
+    # Imposto alto: o Formal ganha com poucas caixas e perde ao passar de US$ 800
+    dados = _dados(40.0, 0.5)
+    cotar = _tarifa(20, 1)
+    resultado = quantidade_equilibrio(dados, 300, cotar=cotar, frete_d2c=12.0)
+    assert resultado["quantidade_tributada"] == 20
+    assert resultado["equilibrio_sem_imposto"] == _primeira_quantidade(dados, cotar, 12.0, range(1, 20))
+    assert resultado["equilibrio_sem_imposto"] is not None
+    assert resultado["equilibrio_com_imposto"] is None
+    assert resultado["quantidade_equilibrio"] == resultado["equilibrio_sem_imposto"]
+
+def _casos_preco(quantidade, semente):
+    sorteio = random.Random(semente)
+    return [(sorteio.randint(1, 200), sorteio.choice([0.0, 0.05, 0.2, 0.35]), sorteio.choice([0.0, 0.0, 0.4]),
+             sorteio.uniform(5, 40), sorteio.uniform(10, 80), sorteio.uniform(0.5, 5)) for _ in range(quantidade)]
+
+@pytest.mark.parametrize("quantidade, tax_rate, especifico, frete_d2c, por_caixa, por_kg", _casos_preco(30, 2))
+def test_preco_equilibrio_igual_a_forca_bruta(quantidade, tax_rate, especifico, frete_d2c, por_caixa, por_kg):
+    dados = _dados(50.0, tax_rate, especifico, item_quantidade=quantidade)
+    cotar = _tarifa(por_caixa, por_kg)
+    resultado = preco_equilibrio(dados, cotar=cotar, frete_d2c=frete_d2c)
+    preco = resultado["preco_equilibrio"]
+    # Acima do preço de equilíbrio o D2C é mais barato; abaixo (ou nele), o Formal
+    for p in np.linspace(0.01, 3 * LIMITE_DE_MINIMIS / quantidade + 200, 400):
+        if math.isfinite(preco) and abs(p - preco) < 1e-6:
+            continue
+        d2c_mais_barato = _custo_formal(dict(dados, item_preco=p), quantidade, cotar) > frete_d2c
+        assert d2c_mais_barato == (p > preco), (p, preco)
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cliente_http
+import hts
+
+# -------------------------
+# SERVIDOR LOCAL COM HTML DE EXEMPLO DO USITC
+# -------------------------
+# 640399 devolve a página de exemplo, 999999 uma página sem resultados e
+# 111111/222222 respondem 404/503. Os testes apontam HTS_BASE_URL para cá.
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "usitc_busca.html")
+SEM_RESULTADOS = "<html><body><table><tr><th>HTS Number</th></tr></table></body></html>"
+STATUS_ERRO = {"111111": 404, "222222": 503}
+
+class ServidorUSITC(BaseHTTPRequestHandler):
+    consultas = []
+
+    def do_GET(self):
+        partes = urlsplit(self.path)
+        consulta = parse_qs(partes.query).get("q", [""])[0]
+        self.consultas.append(consulta)
+        if partes.path != "/search" or consulta in STATUS_ERRO:
+            status, corpo = STATUS_ERRO.get(consulta, 404), "erro"
+        elif consulta == "640399":
+            with open(FIXTURE, encoding="utf-8") as arquivo:
+                status, corpo = 200, arquivo.read()
+        else:
+            status, corpo = 200, SEM_RESULTADOS
+        dados = corpo.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture(scope="module")
+def servidor():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ServidorUSITC)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+@pytest.fixture
+def consulta(servidor, tmp_path, monkeypatch):
+    # Uma tentativa só, para o 503 não esperar o backoff
+    monkeypatch.setattr(cliente_http, "HTTP_TENTATIVAS", 1)
+    ServidorUSITC.consultas.clear()
+    cache = str(tmp_path / "hts_cache.db")
+
+    def buscar(hs6):
+        return hts.buscar_hs_10_digitos(hs6, db_path=cache, base_url=servidor, usar_local=False)
+
+    buscar.cache = cache
+    return buscar
+
+def envelhecer_cache(cache, hs6, segundos):
+    conn = hts._conexao_cache(cache)
+    with conn:
+        conn.execute("UPDATE hts_cache SET consultado_em = consultado_em - ? WHERE hs6 = ?", (segundos, hs6))
+
+def test_encontra_codigo_e_usa_cache(consulta):
+    assert consulta("640399") == ("6403.99.60.75", "10%")
+    assert consulta("6403.99") == ("6403.99.60.75", "10%")
+    assert ServidorUSITC.consultas == ["640399"]
+
+def test_cache_negativo(consulta):
+    assert consulta("999999") == (None, None)
+    assert consulta("999999") == (None, None)
+    assert ServidorUSITC.consultas == ["999999"]
+    assert hts.ler_cache("999999", consulta.cache) == (True, None, None)
+
+def test_ttl_expirado_consulta_de_novo(consulta):
+    consulta("640399")
+    envelhecer_cache(consulta.cache, "640399", hts.HTS_CACHE_TTL + 1)
+    assert hts.ler_cache("640399", consulta.cache) == (False, None, None)
+    assert consulta("640399") == ("6403.99.60.75", "10%")
+    assert ServidorUSITC.consultas == ["640399", "640399"]
+
+def test_ttl_negativo_menor_que_positivo(consulta):
+    consulta("999999")
+    envelhecer_cache(consulta.cache, "999999", hts.HTS_CACHE_TTL_NEGATIVO + 1)
+    consulta("999999")
+    assert ServidorUSITC.consultas == ["999999", "999999"]
+
+@pytest.mark.parametrize("hs6", ["111111", "222222"])
+def test_status_diferente_de_200_nao_vai_para_o_cache(consulta, hs6):
+    assert consulta(hs6) == (None, None)
+    assert hts.ler_cache(hs6, consulta.cache) == (False, None, None)
+    consulta(hs6)
+    assert ServidorUSITC.consultas == [hs6, hs6]
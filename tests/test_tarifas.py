@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tarifas import analisar_taxa
+
+@pytest.mark.parametrize("texto, ad_valorem, especifico, unidade", [
+    ("Free", 0.0, None, None),
+    ("Free (A, AU)", 0.0, None, None),
+    ("6.5%", 0.065, None, None),
+    ("37.5%", 0.375, None, None),
+    ("2.3¢/kg", None, 0.023, "kg"),
+    ("85.8¢/clean kg", None, 0.858, "kg"),
+    ("$1.25/t", None, 1.25, "t"),
+    ("1.5¢/doz", None, 0.015, "dz"),
+    ("3.2¢/liter", None, 0.032, "l"),
+    ("$1.04/head", None, 1.04, "un"),
+    ("30 cents each + 4.3%", 0.043, 0.30, "un"),
+    ("$1.35/kg + 5%", 0.05, 1.35, "kg"),
+    ("4.4¢/kg + 6%", 0.06, 0.044, "kg"),
+])
+def test_analisar_taxa(texto, ad_valorem, especifico, unidade):
+    resultado = analisar_taxa(texto)
+    assert resultado["ad_valorem"] == pytest.approx(ad_valorem)
+    assert resultado["especifico"] == pytest.approx(especifico)
+    assert resultado["unidade"] == unidade
+
+@pytest.mark.parametrize("texto", [None, "", "   ", "N/A", "n/a"])
+def test_analisar_taxa_sem_aliquota(texto):
+    assert analisar_taxa(texto) == {"ad_valorem": None, "especifico": None, "unidade": None}
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+import math
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embalagem import caixa_master_dos_dados
+from varredura import varrer_quantidades
+
+DADOS = {
+    "item_altura": 10, "item_largura": 10, "item_profundidade": 10, "item_peso": 0.5,
+    "item_preco": 50.0, "item_quantidade": 1,
+    "master_altura": 40, "master_largura": 40, "master_profundidade": 40, "master_max_peso": 50.0,
+    "armazenagem": 0.5, "frete_local": 5.0, "tax_rate": 0.1,
+}
+
+# Tarifas sintéticas no formato de cotar_caixas: [{"name", "currency_payment_amount"}]
+def por_caixa_e_kg(boxes):
+    return [{"name": "A", "currency_payment_amount": 30 * len(boxes) + 4 * boxes.peso_total},
+            {"name": "B", "currency_payment_amount": 50 * len(boxes) + 2 * boxes.peso_total ** 1.1}]
+
+def faixas_de_10_kg(boxes):
+    return [{"name": "A", "currency_payment_amount": 20 * math.ceil(boxes.peso_total / 10)}]
+
+def _frete_real(cotar, quantidade):
+    _, _, _, boxes = caixa_master_dos_dados(dict(DADOS, item_quantidade=quantidade))
+    return min(float(t["currency_payment_amount"]) for t in cotar(boxes))
+
+@pytest.mark.parametrize("cotar", [por_caixa_e_kg, faixas_de_10_kg])
+@pytest.mark.parametrize("max_cotacoes", [40, 200])
+def test_erro_maximo_cobre_o_frete_real(cotar, max_cotacoes):
+    curva = varrer_quantidades(DADOS, range(1, 3001), cotar=cotar, max_cotacoes=max_cotacoes)
+    real = np.array([_frete_real(cotar, int(q)) for q in curva["quantidade"]])
+    diferenca = np.abs(real - curva["frete_formal"].to_numpy())
+    assert curva.attrs["cotacoes"] <= max_cotacoes
+    assert not curva["erro_maximo"].isna().any()
+    assert (diferenca <= curva["erro_maximo"].to_numpy() + 1e-9).all()
+    # Nas quantidades cotadas o valor é o real e o erro é zero
+    cotado = curva["cotado"].to_numpy()
+    assert (diferenca[cotado] < 1e-9).all()
+    assert (curva["erro_maximo"].to_numpy()[cotado] == 0).all()
+
+def test_curva_dentro_da_tolerancia():
+    curva = varrer_quantidades(DADOS, range(1, 3001), cotar=por_caixa_e_kg)
+    real = np.array([_frete_real(por_caixa_e_kg, int(q)) for q in curva["quantidade"]])
+    assert (np.abs(real - curva["frete_formal"].to_numpy()) / real).max() < 0.02
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+from cotacao import cotar_caixas
+from custos import calcular_custos_formal_vetorizado
+from embalagem import caixa_master_dos_dados
+
+# -------------------------
+# VARREDURA DE QUANTIDADES COM CURVA DE FRETE INTERPOLADA
+# -------------------------
+# Em vez de cotar o frete formal para cada quantidade, cotamos alguns
+# degraus-âncora e interpolamos o resto, por transportadora. O frete salta
+# a cada caixa nova (taxa por volume), então a curva é montada por número
+# de caixas: num degrau de n caixas as quantidades vão de (n-1)*cap+1
+# (última caixa com um item) a n*cap (todas cheias). Cada degrau-âncora é
+# cotado nas duas pontas; para outro número de caixas, o frete de cada
+# ponta é interpolado entre os degraus-âncora vizinhos e, dentro do degrau,
+# pelo peso (preenchimento da última caixa). Tarifas do tipo "taxa por
+# caixa + valor por kg" são reproduzidas sem erro.
+# Cada intervalo entre degraus-âncora é verificado com uma cotação real no
+# degrau do meio; se o erro passar da tolerância, o degrau vira âncora e o
+# intervalo é subdividido. Dentro de um degrau-âncora a curva passa por
+# todas as quantidades cotadas nele, e o meio de cada trecho também é
+# verificado e subdividido (faixas de peso da transportadora, por exemplo).
+# Quantidades cotadas usam o valor real. O erro_maximo de cada quantidade
+# vem das cotações vizinhas: supondo que o frete não diminui quando a
+# quantidade aumenta, o valor real fica entre elas. É 0 só nas quantidades
+# cotadas e NaN fora do trecho coberto por cotações.
+
+def cotar_por_transportadora(dados, quantidade, cotar=cotar_caixas):
+    _, total_weight, _, boxes = caixa_master_dos_dados(dict(dados, item_quantidade=quantidade))
+    transportadoras = cotar(boxes)
+    if not transportadoras:
+        return total_weight, None
+    return total_weight, {t["name"]: float(t["currency_payment_amount"]) for t in transportadoras}
+
+def _degraus_iniciais(caixas_minimas, caixas_maximas, quantidade_ancoras):
+    degraus = np.unique(np.geomspace(caixas_minimas, caixas_maximas, num=quantidade_ancoras).round().astype(int))
+    return sorted(set(degraus.tolist()) | {caixas_minimas, caixas_maximas})
+
+class CurvaFrete:
+    def __init__(self, dados, cotar=cotar_caixas):
+        self.dados = dados
+        self.cotar = cotar
+        _, _, self.capacidade, _ = caixa_master_dos_dados(dict(dados, item_quantidade=1))
+        self.pontos = {}      # quantidade -> (peso_total, {transportadora: frete})
+        self.degraus = set()  # números de caixas cotados nas duas pontas
+        self.cotacoes = 0
+
+    def caixas(self, quantidade):
+        return -(-quantidade // self.capacidade)
+
+    def pontas(self, caixas):
+        return (caixas - 1) * self.capacidade + 1, caixas * self.capacidade
+
+    def cotar_ponto(self, quantidade):
+        if quantidade not in self.pontos:
+            self.cotacoes += 1
+            self.pontos[quantidade] = cotar_por_transportadora(self.dados, quantidade, self.cotar)
+        return self.pontos[quantidade]
+
+    def ancorar(self, caixas):
+        inicio, fim = self.pontas(caixas)
+        if self.cotar_ponto(inicio)[1] and self.cotar_ponto(fim)[1]:
+            self.degraus.add(caixas)
+            return True
+        return False
+
+    def cotadas(self, inicio, fim):
+        # Quantidades cotadas com sucesso no trecho [inicio, fim], em ordem
+        return sorted(q for q, (_, fretes) in self.pontos.items() if fretes and inicio <= q <= fim)
+
+    def _transportadoras(self):
+        # Só transportadoras presentes em todas as cotações bem-sucedidas
+        conjuntos = [set(fretes) for _, fretes in self.pontos.values() if fretes]
+        return set.intersection(*conjuntos) if conjuntos else set()
+
+    def estimar(self, quantidades, degraus=None):
+        quantidades = np.asarray(quantidades, dtype=int)
+        degraus = sorted(degraus or self.degraus)
+        if not degraus:
+            return {}
+        caixas = -(-quantidades // self.capacidade)
+        inicio = (caixas - 1) * self.capacidade + 1
+        # Fração do caminho entre a ponta "um item na última caixa" e "todas cheias"
+        fracao = (quantidades - inicio) / (self.capacidade - 1) if self.capacidade > 1 else np.zeros(len(quantidades))
+        x = np.array(degraus, dtype=float)
+        # Nos degraus-âncora, interpolação direta entre as quantidades cotadas no degrau
+        ancorados = {n: self.cotadas(*self.pontas(n)) for n in degraus}
+        curvas = {}
+        for nome in self._transportadoras():
+            frete_inicio = np.interp(caixas, x, [self.pontos[self.pontas(n)[0]][1][nome] for n in degraus])
+            frete_fim = np.interp(caixas, x, [self.pontos[self.pontas(n)[1]][1][nome] for n in degraus])
+            curva = frete_inicio + (frete_fim - frete_inicio) * fracao
+            for n, cotadas in ancorados.items():
+                dentro = caixas == n
+                if dentro.any():
+                    curva[dentro] = np.interp(quantidades[dentro], cotadas,
+                                              [self.pontos[q][1][nome] for q in cotadas])
+            for i, q in enumerate(quantidades.tolist()):
+                fretes = self.pontos.get(q, (None, None))[1]
+                if fretes:
+                    curva[i] = fretes[nome]
+            curvas[nome] = curva
+        return curvas
+
+    def _erro_verificacao(self, quantidade, degraus=None):
+        # Estima antes de cotar (a cotação entraria na própria estimativa) e
+        # compara com o valor real; None se a cotação falhar
+        estimado = self.estimar([quantidade], degraus=degraus)
+        _, fretes = self.cotar_ponto(quantidade)
+        if not fretes:
+            return None, None
+        erro = max((abs(curva[0] - fretes[nome]) for nome, curva in estimado.items() if nome in fretes), default=0.0)
+        return erro, min(fretes.values())
+
+    def refinar(self, inicio, fim, tolerancia, max_cotacoes):
+        # Verifica o degrau do meio do intervalo e subdivide enquanto o erro
+        # for alto. Intervalos de degraus vizinhos não têm degrau no meio.
+        pilha = [(inicio, fim)]
+        while pilha:
+            a, b = pilha.pop()
+            if b - a < 2 or self.cotacoes + 3 > max_cotacoes:
+                continue
+            meio = (a + b) // 2
+            verificacao = sum(self.pontas(meio)) // 2
+            erro, referencia = self._erro_verificacao(verificacao, [a, b])
+            if erro is not None and referencia and erro / referencia > tolerancia and self.ancorar(meio):
+                pilha.extend([(a, meio), (meio, b)])
+
+    def refinar_degrau(self, caixas, tolerancia, max_cotacoes):
+        # Dentro de um degrau-âncora: verifica o meio de cada trecho entre
+        # quantidades cotadas e subdivide enquanto o erro for alto
+        cotadas = self.cotadas(*self.pontas(caixas))
+        pilha = list(zip(cotadas, cotadas[1:]))
+        while pilha:
+            a, b = pilha.pop()
+            if b - a < 2 or self.cotacoes + 1 > max_cotacoes:
+                continue
+            meio = (a + b) // 2
+            erro, referencia = self._erro_verificacao(meio)
+            if erro is not None and referencia and erro / referencia > tolerancia:
+                pilha.extend([(a, meio), (meio, b)])
+
+def varrer_quantidades(dados, quantidades, tolerancia=0.02, quantidade_ancoras=6, max_cotacoes=40,
+                       cotar=cotar_caixas, frete_d2c=None):
+    quantidades = np.unique(np.asarray(quantidades, dtype=int))
+    curva = CurvaFrete(dados, cotar)
+    degraus = _degraus_iniciais(curva.caixas(int(quantidades[0])), curva.caixas(int(quantidades[-1])),
+                                quantidade_ancoras)
+    degraus = [n for n in degraus if curva.ancorar(n)]
+    for a, b in zip(degraus, degraus[1:]):
+        curva.refinar(a, b, tolerancia, max_cotacoes)
+    for n in sorted(curva.degraus):
+        curva.refinar_degrau(n, tolerancia, max_cotacoes)
+
+    curvas = curva.estimar(quantidades)
+    if not curvas:
+        return None
+    nomes = sorted(curvas)
+    matriz = np.vstack([curvas[nome] for nome in nomes])
+    melhor = matriz.argmin(axis=0)
+    frete = matriz[melhor, np.arange(len(quantidades))]
+
+    # Limite do erro pelas cotações vizinhas (menor frete entre as
+    # transportadoras da curva): com frete não decrescente na quantidade, o
+    # valor real de q fica entre o da cotação anterior e o da seguinte
+    cotadas = np.array(curva.cotadas(1, max(curva.pontos)), dtype=int)
+    minimos = np.array([min(curva.pontos[q][1][nome] for nome in nomes) for q in cotadas.tolist()])
+    cotado = np.isin(quantidades, cotadas)
+    seguinte = np.searchsorted(cotadas, quantidades)
+    coberto = (seguinte > 0) & (seguinte < len(cotadas))
+    erro = np.full(len(quantidades), np.nan)
+    anterior_valor = minimos[seguinte[coberto] - 1]
+    seguinte_valor = minimos[seguinte[coberto]]
+    erro[coberto] = np.maximum(np.abs(frete[coberto] - anterior_valor), np.abs(frete[coberto] - seguinte_valor))
+    erro[cotado] = 0.0
+
+    custos = calcular_custos_formal_vetorizado(
+        dados["item_preco"], quantidades, dados["tax_rate"], frete, dados["armazenagem"], dados["frete_local"],
+        imposto_especifico=dados.get("imposto_especifico", 0.0)
+    )
+    resultado = pd.DataFrame({
+        "quantidade": quantidades,
+        "transportadora": [nomes[i] for i in melhor],
+        "frete_formal": frete,
+        "erro_maximo": erro,
+        "cotado": cotado,
+        "formal_por_item": custos["formal_por_item"],
+    })
+    if frete_d2c is not None:
+        resultado["d2c_por_item"] = frete_d2c
+    resultado.attrs["cotacoes"] = curva.cotacoes
+    return resultado